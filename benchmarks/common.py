@@ -0,0 +1,42 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts are meant to be run from the root of the repository, e.g.::
+
+    python benchmarks/feed_item.py
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    """Configure Django with the settings of the test app."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.app.settings')
+    os.environ.setdefault('DATABASE_NAME', ':memory:')
+
+    import django
+    django.setup()
+
+
+def load_fixture(name):
+    with open(os.path.join(ROOT, 'tests', 'fixtures', name), 'r') as fixture:
+        return json.load(fixture)
+
+
+def bench(label, func, number=10, repeat=5):
+    """Time `func` and print the best time per call."""
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+    print("{:<50} {:>10.3f} ms".format(label, best * 1000))
+    return best
+
+
+def report_gain(baseline, improved):
+    print("{:<50} {:>10.2f}x".format("speedup", baseline / improved))
@@ -0,0 +1,106 @@
+"""
+Benchmark refreshing an unchanged feed with and without conditional requests.
+
+Serves a page of `POSTS` Instagram posts from a local stub server. The
+baseline server sends a new `ETag` with every response, so each refresh
+downloads, decodes, converts and caches the page again. The other one keeps
+its `ETag`, so refreshing the feed gets a `304 Not Modified` reply and just
+extends the cached entry.
+
+Run from the root of the repository::
+
+    python benchmarks/conditional_get.py
+"""
+from __future__ import print_function, unicode_literals
+
+import itertools
+import json
+import threading
+
+from common import bench, load_fixture, report_gain, setup_django
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.utils.six.moves import BaseHTTPServer, socketserver  # noqa: E402
+
+from wagtailsocialfeed.models import SocialFeedConfiguration  # noqa: E402
+from wagtailsocialfeed.utils.feed.instagram import (InstagramFeed,  # noqa: E402
+                                                    InstagramFeedQuery)
+
+POSTS = 50
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    counter = itertools.count()
+    fixed_etag = True
+
+    def do_GET(self):
+        etag = '"v1"' if self.fixed_etag else '"v{}"'.format(next(self.counter))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def make_feed(url):
+    class StubFeedQuery(InstagramFeedQuery):
+        def _get_url(self, max_id=None):
+            return url
+
+    class StubFeed(InstagramFeed):
+        query_cls = StubFeedQuery
+
+    return StubFeed()
+
+
+def main():
+    fixture = load_fixture('instagram.json')
+    nodes = fixture['user']['media']['nodes']
+    fixture['user']['media']['nodes'] = [
+        dict(nodes[index % len(nodes)], id=str(index)) for index in range(POSTS)]
+
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    server.body = json.dumps(fixture).encode('utf-8')
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    feed = make_feed('http://127.0.0.1:{}/wagtail/'.format(server.server_address[1]))
+    config = SocialFeedConfiguration(id=1, source='instagram', username='wagtail')
+
+    print("Refreshing an unchanged feed of {} posts".format(POSTS))
+    try:
+        cache.clear()
+        StubHandler.fixed_etag = False
+        feed.get_items(config)
+        baseline = bench("refresh (full response)", lambda: feed.refresh(config))
+
+        cache.clear()
+        StubHandler.fixed_etag = True
+        feed.get_items(config)
+        improved = bench("refresh (304 Not Modified)", lambda: feed.refresh(config))
+        report_gain(baseline, improved)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark the parsing of the timestamps of the sources.
+
+Compares the dateutil parser with the fast parsers in
+`wagtailsocialfeed.utils.dates` on a few thousand timestamps taken from
+the fixtures, both with distinct timestamps and with the repeated ones of
+a feed which is refreshed over and over.
+
+Run from the root of the repository::
+
+    python benchmarks/dates.py
+"""
+from __future__ import print_function, unicode_literals
+
+import datetime
+
+from common import bench, load_fixture, report_gain, setup_django
+
+setup_django()
+
+from dateutil import parser as dateparser  # noqa: E402
+
+from wagtailsocialfeed.utils.dates import (parse_iso_date,  # noqa: E402
+                                           parse_twitter_date)
+
+TIMESTAMPS = 5000
+
+
+def spread(values, format_date):
+    """Return `TIMESTAMPS` distinct timestamps based on the given ones."""
+    result = []
+    for index in range(TIMESTAMPS):
+        date = dateparser.parse(values[index % len(values)])
+        result.append(format_date(date - datetime.timedelta(minutes=index)))
+    return result
+
+
+def parse_all(parse, values):
+    for value in values:
+        parse(value)
+
+
+def run(label, func):
+    # The dateutil parser is slow enough to time a single pass
+    return bench(label, func, number=1, repeat=3)
+
+
+def compare(label, parse, values):
+    def fast():
+        # Measure the parser itself, not the memoization
+        parse.cache_clear()
+        parse_all(parse, values)
+
+    report_gain(run("{} (dateutil)".format(label),
+                    lambda: parse_all(dateparser.parse, values)),
+                run("{} (fast path)".format(label), fast))
+
+
+def main():
+    tweets = [raw['created_at'] for raw in load_fixture('twitter.json')]
+    posts = [raw['created_time'] for raw in load_fixture('facebook.json')['data']]
+
+    twitter_dates = spread(tweets, lambda date: date.strftime('%a %b %d %H:%M:%S +0000 %Y'))
+    facebook_dates = spread(posts, lambda date: date.strftime('%Y-%m-%dT%H:%M:%S+0000'))
+    repeated = [tweets[index % len(tweets)] for index in range(TIMESTAMPS)]
+
+    print("{} timestamps".format(TIMESTAMPS))
+    compare("twitter", parse_twitter_date, twitter_dates)
+    compare("facebook", parse_iso_date, facebook_dates)
+    report_gain(run("twitter, repeated (dateutil)",
+                    lambda: parse_all(dateparser.parse, repeated)),
+                run("twitter, repeated (memoized)",
+                    lambda: parse_all(parse_twitter_date, repeated)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark the attribute access of `FeedItem`.
+
+Compares the slotted `FeedItem` against the previous implementation, which
+overrode `__getattribute__`, on a list of 10k items: sorting on `posted`,
+reading the fields used by the templates and the memory used by the items.
+
+Run from the root of the repository::
+
+    python benchmarks/feed_item.py
+"""
+from __future__ import print_function, unicode_literals
+
+import sys
+
+from common import bench, load_fixture, report_gain, setup_django
+
+setup_django()
+
+from django.utils import six  # noqa: E402
+
+from wagtailsocialfeed.utils.feed.twitter import TwitterFeedItem  # noqa: E402
+
+ITEMS = 10000
+
+
+class LegacyFeedItem(object):
+    """The `FeedItem` as it was before it had slots."""
+    def __init__(self, id, type, text, posted, image_dict, *args, **kwargs):
+        self.id = six.text_type(id)
+        self.type = type
+        self.text = text
+        self.posted = posted
+        self.image_dict = image_dict
+        self.original_data = kwargs.get('original_data', {})
+
+    @property
+    def image(self):
+        return self.image_dict
+
+    def __getattribute__(self, name):
+        try:
+            return object.__getattribute__(self, name)
+        except AttributeError as e:
+            original_data = object.__getattribute__(self, 'original_data')
+            if name in original_data:
+                return original_data[name]
+            raise e
+
+
+def create_items(item_cls, raw_items):
+    items = []
+    for index in range(ITEMS):
+        raw = raw_items[index % len(raw_items)]
+        items.append(item_cls(
+            id=index,
+            type='twitter',
+            text=raw['text'],
+            image_dict=None,
+            posted=TwitterFeedItem.get_post_date(raw),
+            original_data=raw))
+    return items
+
+
+def sort(items):
+    sorted(items, key=lambda x: x.posted, reverse=True)
+
+
+def render(items):
+    for item in items:
+        item.text
+        item.image
+        item.posted
+        item.lang
+
+
+def size_of(items):
+    """Approximate the memory used by the items themselves."""
+    size = 0
+    for item in items:
+        size += sys.getsizeof(item)
+        if hasattr(item, '__dict__'):
+            size += sys.getsizeof(item.__dict__)
+    return size
+
+
+def main():
+    raw_items = load_fixture('twitter.json')
+    legacy = create_items(LegacyFeedItem, raw_items)
+    slotted = create_items(TwitterFeedItem, raw_items)
+
+    print("{} items".format(ITEMS))
+    report_gain(bench("sort on posted (__getattribute__)", lambda: sort(legacy)),
+                bench("sort on posted (__slots__)", lambda: sort(slotted)))
+    report_gain(bench("template attributes (__getattribute__)", lambda: render(legacy)),
+                bench("template attributes (__slots__)", lambda: render(slotted)))
+
+    legacy_size, slotted_size = size_of(legacy), size_of(slotted)
+    print("{:<50} {:>10.1f} KB".format("item memory (__getattribute__)", legacy_size / 1024.0))
+    print("{:<50} {:>10.1f} KB".format("item memory (__slots__)", slotted_size / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark the shared HTTP session against a request per page.
+
+Serves the Instagram fixture from a local stub server, which waits
+`HANDSHAKE_DELAY` seconds for every new connection to stand in for the
+TCP and TLS handshakes with a remote host. Then loads `PAGES` pages with
+`requests.get` (a new connection per page, like before) and with
+`wagtailsocialfeed.utils.http.get` (a kept-alive connection).
+
+Run from the root of the repository::
+
+    python benchmarks/http_session.py
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import socket
+import threading
+import time
+
+from common import bench, load_fixture, report_gain, setup_django
+
+setup_django()
+
+import requests  # noqa: E402
+from django.utils.six.moves import BaseHTTPServer, socketserver  # noqa: E402
+
+from wagtailsocialfeed.utils import http  # noqa: E402
+
+PAGES = 20
+HANDSHAKE_DELAY = 0.02
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = json.dumps(load_fixture('instagram.json')).encode('utf-8')
+
+    def setup(self):
+        # Once per connection
+        time.sleep(HANDSHAKE_DELAY)
+        # Don't let Nagle's algorithm delay the responses on a kept-alive
+        # connection, as a real server wouldn't either
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def load_pages(get, url):
+    for page in range(PAGES):
+        get('{}?max_id={}'.format(url, page)).json()
+
+
+def main():
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}/wagtail/'.format(server.server_address[1])
+
+    print("{} pages, {:.0f} ms per handshake".format(PAGES, HANDSHAKE_DELAY * 1000))
+    try:
+        baseline = bench("all pages (requests.get)",
+                         lambda: load_pages(requests.get, url), number=1, repeat=3)
+        improved = bench("all pages (shared session)",
+                         lambda: load_pages(http.get, url), number=1, repeat=3)
+        report_gain(baseline, improved)
+        print("{:<50} {:>10.3f} ms".format(
+            "saved per page", (baseline - improved) / PAGES * 1000))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark the JSON backends of `wagtailsocialfeed.utils.serializer`.
+
+Serializes the items of the Twitter fixture, as done by the moderation
+page, and deserializes them again, as done when rendering a moderated feed,
+with each of the backends which is installed.
+
+Run from the root of the repository::
+
+    python benchmarks/serializer.py
+"""
+from __future__ import print_function, unicode_literals
+
+from common import bench, load_fixture, report_gain, setup_django
+
+setup_django()
+
+from django.core.exceptions import ImproperlyConfigured  # noqa: E402
+
+from wagtailsocialfeed.utils import serializer  # noqa: E402
+from wagtailsocialfeed.utils.feed.twitter import TwitterFeedItem  # noqa: E402
+
+ITEMS = 1000
+
+
+def main():
+    raw_items = load_fixture('twitter.json')
+    items = [TwitterFeedItem.from_raw(raw_items[index % len(raw_items)]).as_dict()
+             for index in range(ITEMS)]
+    contents = [serializer.get_backend('json')[0](item) for item in items]
+
+    print("{} items".format(ITEMS))
+    baseline = {}
+    for name in serializer.AUTO_BACKENDS[::-1]:
+        try:
+            dumps, loads = serializer.get_backend(name)
+        except ImproperlyConfigured:
+            print("{:<50} {:>13}".format(name, "not installed"))
+            continue
+
+        for direction, func, values in (('dumps', dumps, items),
+                                        ('loads', loads, contents)):
+            timing = bench("{} ({})".format(direction, name),
+                           lambda: [func(value) for value in values])
+            if direction in baseline:
+                report_gain(baseline[direction], timing)
+            else:
+                baseline[direction] = timing
+
+
+if __name__ == '__main__':
+    main()
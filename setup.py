@@ -14,9 +14,10 @@ install_requires = [
     'twython>=3.0,<4.0',
     'facepy>=1.0.8',
     'wagtailfontawesome>=1.0',
-    'requests>=2.0',
+    'requests>=2.10',
     'python-dateutil>=2.5',
     'enum34',
+    'futures>=3.0; python_version < "3.0"',
 ]
 
 test_require = [
@@ -32,6 +33,11 @@ test_require = [
     'bumpversion==0.5.3',
     'wheel==0.29.0',
     'django-coverage-plugin==1.3.1',
+    'aiohttp>=3.3; python_version >= "3.5.3"',
+]
+
+async_require = [
+    'aiohttp>=3.3',
 ]
 
 docs_require = [
@@ -68,5 +74,6 @@ setup(
     extras_require={
         'testing': test_require,
         'docs': docs_require,
+        'async': async_require,
     },
 )
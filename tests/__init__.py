@@ -2,11 +2,32 @@ from __future__ import unicode_literals
 
 import json
 import re
+from contextlib import contextmanager
 from functools import wraps
 
 import responses
 
 
+@contextmanager
+def count_conversions(item_cls):
+    """
+    Collect the ids of the items of `item_cls` created in the block,
+    i.e. the raw or cached posts converted into `FeedItem`s.
+    """
+    converted = []
+    original_init = item_cls.__init__
+
+    def counting_init(item, *args, **kwargs):
+        converted.append(kwargs['id'])
+        original_init(item, *args, **kwargs)
+
+    item_cls.__init__ = counting_init
+    try:
+        yield converted
+    finally:
+        item_cls.__init__ = original_init
+
+
 def _facebook(modified):
     with open('tests/fixtures/facebook.json', 'r') as feed_file:
         lines = feed_file.readlines()
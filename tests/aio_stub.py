@@ -0,0 +1,95 @@
+"""
+A local aiohttp server standing in for the APIs of the sources, used by
+the tests of `wagtailsocialfeed.utils.feed.aio`.
+
+It requires Python 3.5+ and aiohttp, so it's kept out of the test modules.
+"""
+import asyncio
+import collections
+import json
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+FIXTURES = {
+    'api.twitter.com': 'tests/fixtures/twitter.json',
+    'www.instagram.com': 'tests/fixtures/instagram.json',
+    'graph.facebook.com': 'tests/fixtures/facebook.json',
+}
+
+
+class StubSession(object):
+    """Wraps an `aiohttp.ClientSession`, sending the requests to the stub server."""
+
+    def __init__(self, session, server_url):
+        self.session = session
+        self.server_url = server_url
+
+    def get(self, url, headers=None, **kwargs):
+        url = URL(str(url), encoded=True)
+        headers = dict(headers or {}, **{'X-Stub-Host': url.host})
+        return self.session.get(
+            URL(self.server_url + url.raw_path_qs, encoded=True),
+            headers=headers, **kwargs)
+
+
+class StubServer(object):
+    """
+    Serves the fixture of each source, after a delay of `delay` seconds.
+
+    Keeps track of the requests and of the maximum amount of concurrent
+    requests per host. Hosts with an ETag in `etags` reply 304 to requests
+    for that ETag.
+    """
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.requests = []
+        self.active = collections.Counter()
+        self.max_active = collections.Counter()
+        self.fixtures = {}
+        self.etags = {}
+        for host, path in FIXTURES.items():
+            with open(path, 'r') as feed_file:
+                self.fixtures[host] = json.load(feed_file)
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        app = web.Application()
+        app.router.add_route('GET', '/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        self.url = 'http://127.0.0.1:{}'.format(self.runner.addresses[0][1])
+
+    def stop(self):
+        self.loop.run_until_complete(self.runner.cleanup())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    async def handle(self, request):
+        host = request.headers['X-Stub-Host']
+        self.requests.append((host, request.path_qs, dict(request.headers)))
+        etag = self.etags.get(host)
+        if etag and request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        self.active[host] += 1
+        self.max_active[host] = max(self.max_active[host], self.active[host])
+        try:
+            await asyncio.sleep(self.delay)
+            headers = {'ETag': etag} if etag else None
+            return web.json_response(self.fixtures[host], headers=headers)
+        finally:
+            self.active[host] -= 1
+
+    def run(self, func, *args, **kwargs):
+        """Run the coroutine `func(*args, session=..., **kwargs)` against the stub."""
+        async def run():
+            async with aiohttp.ClientSession() as session:
+                return await func(*args, session=StubSession(session, self.url),
+                                  **kwargs)
+        return self.loop.run_until_complete(run())
@@ -0,0 +1,162 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from wagtailsocialfeed.utils.feed.factory import FeedFactory
+from wagtailsocialfeed.utils.feed.twitter import TwitterFeed
+
+from . import feed_response
+from .factories import SocialFeedConfigurationFactory
+
+try:
+    from .aio_stub import StubServer
+except (ImportError, SyntaxError):
+    # Requires Python 3.5+ and aiohttp
+    StubServer = None
+
+
+@unittest.skipIf(StubServer is None, "requires Python 3.5+ and aiohttp")
+class AsyncFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.server = StubServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @feed_response(['twitter', 'instagram', 'facebook'])
+    def test_aget_items(self, tweets, instagram_posts, facebook_posts):
+        for source in ('twitter', 'instagram', 'facebook'):
+            config = SocialFeedConfigurationFactory.create(source=source)
+            feed = FeedFactory.create(source)
+            expected = feed.get_items(config, limit=5, use_cache=False)
+
+            items = self.server.run(feed.aget_items, config, limit=5)
+            self.assertEqual([item.id for item in items],
+                             [item.id for item in expected])
+            self.assertEqual([item.text for item in items],
+                             [item.text for item in expected])
+            self.assertIsNotNone(feed.get_refreshed_at(config))
+
+            # Served from the cache the next time
+            requests = len(self.server.requests)
+            self.server.run(feed.aget_items, config)
+            self.assertEqual(len(self.server.requests), requests)
+
+        host, path, headers = self.server.requests[0]
+        self.assertEqual(host, 'api.twitter.com')
+        self.assertIn('screen_name=', path)
+        self.assertTrue(headers['Authorization'].startswith('OAuth '))
+
+    def test_arefresh(self):
+        config = SocialFeedConfigurationFactory.create(source='twitter')
+        feed = FeedFactory.create('twitter')
+        items = self.server.run(feed.arefresh, config)
+        self.assertEqual(len(items), 17)
+        self.assertNotIn('since_id', self.server.requests[-1][1])
+
+        # Only the newer tweets are requested the next time
+        items = self.server.run(feed.arefresh, config)
+        self.assertEqual(len(items), 17)
+        self.assertIn('since_id={}'.format(items[0].id),
+                      self.server.requests[-1][1])
+
+    def test_conditional_refresh(self):
+        self.server.etags['www.instagram.com'] = '"v1"'
+        config = SocialFeedConfigurationFactory.create(source='instagram')
+        feed = FeedFactory.create('instagram')
+        cache_key = feed._get_cache_key(config)
+
+        self.assertEqual(len(self.server.run(feed.arefresh, config)), 12)
+        self.assertNotIn('If-None-Match', self.server.requests[-1][2])
+        self.assertEqual(cache.get(cache_key + ':validators'), {'ETag': '"v1"'})
+        entry = cache.get(cache_key)
+
+        # Not modified: the cached entry just gets a new expiry
+        self.assertEqual(len(self.server.run(feed.arefresh, config)), 12)
+        self.assertEqual(self.server.requests[-1][2]['If-None-Match'], '"v1"')
+        extended = cache.get(cache_key)
+        self.assertEqual(extended['items'], entry['items'])
+        self.assertGreater(extended['expires'], entry['expires'])
+        self.assertEqual(cache.get(cache_key + ':validators'), {'ETag': '"v1"'})
+
+        # Modified
+        self.server.etags['www.instagram.com'] = '"v2"'
+        self.assertEqual(len(self.server.run(feed.arefresh, config)), 12)
+        self.assertEqual(cache.get(cache_key + ':validators'), {'ETag': '"v2"'})
+
+    @override_settings(WAGTAIL_SOCIALFEED_ASYNC_CONCURRENCY=3)
+    def test_arefresh_many(self):
+        from wagtailsocialfeed.utils.feed.aio import arefresh_many
+
+        configs = [
+            SocialFeedConfigurationFactory.create(source=source)
+            for source in ['twitter', 'instagram'] * 20]
+        results = self.server.run(arefresh_many, configs)
+
+        self.assertEqual(len(self.server.requests), 40)
+        for config in configs:
+            self.assertTrue(results[config.id])
+            self.assertIsNotNone(
+                FeedFactory.create(config.source).get_refreshed_at(config))
+        # The requests are concurrent, but bounded per source
+        self.assertEqual(self.server.max_active['api.twitter.com'], 3)
+        self.assertEqual(self.server.max_active['www.instagram.com'], 3)
+
+
+@unittest.skipIf(StubServer is None, "requires Python 3.5+ and aiohttp")
+class AsyncBlockingCallsTest(TransactionTestCase):
+    """The cache and the database are used from the threads of the executor."""
+
+    def setUp(self):
+        cache.clear()
+        self.server = StubServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    @override_settings(WAGTAIL_SOCIALFEED_PERSISTENT_STORE=True)
+    def test_off_the_loop(self):
+        calls = []
+
+        class RecordingFeed(TwitterFeed):
+            pass
+
+        def record(name):
+            method = getattr(TwitterFeed, name)
+
+            def wrapper(self, *args, **kwargs):
+                calls.append((name, threading.current_thread()))
+                return method(self, *args, **kwargs)
+            setattr(RecordingFeed, name, wrapper)
+
+        names = ['_acquire_refresh_lock', '_release_refresh_lock',
+                 '_get_cache_entry', '_get_full_refreshed', '_save_items',
+                 '_get_entry_or_stored']
+        for name in names:
+            record(name)
+
+        config = SocialFeedConfigurationFactory.create(source='twitter')
+        feed = RecordingFeed()
+        self.assertEqual(len(self.server.run(feed.arefresh, config)), 17)
+        self.assertEqual(config.stored_items.count(), 17)
+        # Incremental
+        self.assertEqual(len(self.server.run(feed.arefresh, config)), 17)
+
+        # Served from the persistent store once the cache is gone (read-only,
+        # as the stale items would be refreshed in the background otherwise)
+        cache.clear()
+        requests = len(self.server.requests)
+        with override_settings(WAGTAIL_SOCIALFEED_CACHE_READ_ONLY=True):
+            self.assertEqual(len(self.server.run(feed.aget_items, config)), 17)
+        self.assertEqual(len(self.server.requests), requests)
+
+        self.assertEqual(set(name for name, thread in calls), set(names))
+        self.assertNotIn(threading.current_thread(),
+                         [thread for name, thread in calls])
@@ -0,0 +1,100 @@
+from __future__ import unicode_literals
+
+import json
+import re
+import time
+
+import responses
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from wagtailsocialfeed.management.commands.socialfeed_refresh import Command
+from wagtailsocialfeed.utils.feed.factory import FeedFactory
+
+from . import feed_response
+from .factories import SocialFeedConfigurationFactory
+
+
+class SocialFeedRefreshTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.twitterconfig = SocialFeedConfigurationFactory.create(
+            source='twitter',
+            username='wagtailcms')
+        self.instagramconfig = SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='wagtail',
+            moderated=True)
+
+    @feed_response(['twitter', 'instagram'])
+    def test_refresh_once(self, tweets, instagram_posts):
+        out = StringIO()
+        call_command('socialfeed_refresh', once=True, verbosity=2, stdout=out)
+        self.assertIn('Refreshed twitter (@wagtailcms)', out.getvalue())
+        self.assertIn('Refreshed instagram (wagtail)', out.getvalue())
+
+        twitter = FeedFactory.create('twitter')
+        refreshed_at = twitter.get_refreshed_at(self.twitterconfig)
+        self.assertIsNotNone(refreshed_at)
+        instagram = FeedFactory.create('instagram')
+        self.assertIsNotNone(instagram.get_refreshed_at(self.instagramconfig))
+
+        # Nothing is due yet; that is determined without reading the
+        # cached items (which are gone here)
+        cache_key = twitter._get_cache_key(self.twitterconfig)
+        entry = cache.get(cache_key)
+        cache.set(cache_key, None)
+        calls = len(responses.calls)
+        call_command('socialfeed_refresh', once=True)
+        self.assertEqual(len(responses.calls), calls)
+        cache.set(cache_key, entry)
+
+        call_command('socialfeed_refresh', once=True, interval=0)
+        self.assertGreater(len(responses.calls), calls)
+        self.assertGreater(twitter.get_refreshed_at(self.twitterconfig),
+                           refreshed_at)
+
+    @responses.activate
+    def test_refresh_failing_source(self):
+        err = StringIO()
+        call_command('socialfeed_refresh', once=True, stderr=err)
+        self.assertIn('Refreshing twitter (@wagtailcms) failed', err.getvalue())
+        self.assertIn('Refreshing instagram (wagtail) failed', err.getvalue())
+
+    @responses.activate
+    def test_refresh_batched(self):
+        with open('tests/fixtures/facebook.json', 'r') as feed_file:
+            body = json.dumps({'code': 200, 'headers': [],
+                               'body': feed_file.read()})
+        responses.add(responses.POST,
+                      re.compile('https?://graph.facebook.com.*'),
+                      body='[{0}, {0}]'.format(body), status=200,
+                      content_type='application/json')
+        SocialFeedConfigurationFactory.create(
+            source='facebook', username='wagtail')
+        SocialFeedConfigurationFactory.create(
+            source='facebook', username='other')
+
+        out = StringIO()
+        call_command('socialfeed_refresh', once=True, verbosity=2,
+                     stdout=out, stderr=StringIO())
+        self.assertIn('Refreshed facebook (wagtail)', out.getvalue())
+        self.assertIn('Refreshed facebook (other)', out.getvalue())
+        # Both facebook feeds are refreshed in a single round trip
+        self.assertEqual(
+            len([call for call in responses.calls
+                 if 'graph.facebook.com' in call.request.url]), 1)
+
+    def test_cycle_survives_errors(self):
+        class FailingCommand(Command):
+            def refresh_due(self, executor):
+                raise DatabaseError("server closed the connection")
+
+        err = StringIO()
+        next_due = FailingCommand(stderr=err).run_cycle(executor=None)
+        self.assertIn('Refreshing the feeds failed: server closed the connection',
+                      err.getvalue())
+        self.assertGreater(next_due, time.time())
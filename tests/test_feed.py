@@ -1,13 +1,21 @@
 import datetime
 import json
+import pickle
 import re
+import threading
+import time
+import warnings
+import zlib
 
 import responses
 from dateutil.tz import tzutc
 from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.utils import timezone
+from django.utils.six.moves.urllib.parse import parse_qs
 
+from wagtailsocialfeed.utils.cache import (CACHE_FORMAT, encode_items,
+                                           get_payload_size)
 from wagtailsocialfeed.utils.feed import AbstractFeed, FeedError, FeedItem
 from wagtailsocialfeed.utils.feed.facebook import (FacebookFeed,
                                                    FacebookFeedItem)
@@ -16,7 +24,7 @@ from wagtailsocialfeed.utils.feed.instagram import (InstagramFeed,
                                                     InstagramFeedItem)
 from wagtailsocialfeed.utils.feed.twitter import TwitterFeed, TwitterFeedItem
 
-from . import feed_response
+from . import count_conversions, feed_response
 from .factories import SocialFeedConfigurationFactory
 
 
@@ -32,6 +40,40 @@ class AbstractFeedTest(TestCase):
             self.feed.get_items(self.feedconfig)
 
 
+class FeedItemTest(TestCase):
+    def setUp(self):
+        self.item = TwitterFeedItem(
+            id=1, type='twitter', text='Hello', image_dict=None,
+            posted=datetime.datetime(2016, 9, 23, 8, 28, 16, tzinfo=timezone.utc),
+            original_data={'lang': 'en', 'text': 'Original'})
+
+    def test_attributes(self):
+        self.assertEqual(self.item.id, '1')
+        self.assertEqual(self.item.text, 'Hello')
+        # Falls back to the original data
+        self.assertEqual(self.item.lang, 'en')
+        with self.assertRaises(AttributeError):
+            self.item.unknown
+        self.assertFalse(hasattr(self.item, '__dict__'))
+
+    def test_pickle(self):
+        item = pickle.loads(pickle.dumps(self.item, pickle.HIGHEST_PROTOCOL))
+        self.assertIsInstance(item, TwitterFeedItem)
+        self.assertEqual(item.as_dict(), self.item.as_dict())
+        self.assertEqual(item.lang, 'en')
+
+    def test_serialize(self):
+        self.item.allowed = True
+        self.assertEqual(json.loads(self.item.serialize()), {
+            'id': '1',
+            'type': 'twitter',
+            'text': 'Hello',
+            'posted': '2016-09-23T08:28:16+00:00',
+            'image_dict': None,
+            'original_data': {'lang': 'en', 'text': 'Original'},
+        })
+
+
 class FeedFactoryTest(TestCase):
     def test_create(self):
         self.assertIsInstance(FeedFactory.create('twitter'), TwitterFeed)
@@ -125,6 +167,72 @@ class TwitterFeedTest(TestCase):
         for s in stream:
             self.assertIn('release', s.text)
 
+    @responses.activate
+    def test_incremental_refresh(self):
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            page1 = json.loads("".join(feed_file.readlines()))
+        new_tweet = dict(page1[0], id=page1[0]['id'] + 1, text='Brand new')
+
+        responses.add(responses.GET,
+                      re.compile(r'(?!.*since_id=\d*)https?://api.twitter.com.*'),
+                      json=page1, status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*since_id=\d*)(?!.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=[new_tweet], status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*since_id=\d*)(?=.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=[], status=200)
+
+        previous = self.stream.get_items(config=self.feedconfig)
+        stream = self.stream._refresh(self.feedconfig, previous=previous)
+
+        self.assertIn('since_id={}'.format(previous[0].id),
+                      responses.calls[1].request.url)
+        # Trimmed to the original length
+        self.assertEqual(len(stream), 17)
+        self.assertEqual(stream[0].text, 'Brand new')
+        self.assertEqual([item.id for item in stream[1:]],
+                         [item.id for item in previous[:-1]])
+
+        with override_settings(WAGTAIL_SOCIALFEED_MAX_ITEMS=20):
+            stream = self.stream._refresh(self.feedconfig, previous=previous)
+        self.assertEqual(len(stream), 18)
+
+    @responses.activate
+    def test_full_refresh(self):
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            page1 = json.loads(feed_file.read())
+        # The second tweet has been deleted since
+        page2 = [page1[0]] + page1[2:]
+        responses.add(responses.GET,
+                      re.compile(r'(?!.*since_id=\d*)https?://api.twitter.com.*'),
+                      json=page2, status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*since_id=\d*)https?://api.twitter.com.*'),
+                      json=[], status=200)
+        deleted_id = str(page1[1]['id'])
+
+        previous = [TwitterFeedItem.from_raw(raw) for raw in page1]
+        self.stream._store_items(self.feedconfig, None, previous)
+
+        # Only the newer tweets are fetched, the deleted one stays
+        stream = self.stream._refresh(self.feedconfig, previous=previous)
+        self.assertIn('since_id=', responses.calls[-1].request.url)
+        self.assertIn(deleted_id, [item.id for item in stream])
+
+        # Until the feed is due to be fetched in full again
+        cache.set(self.cache_key + ':full', time.time() - 3601)
+        stream = self.stream._refresh(self.feedconfig, previous=stream)
+        self.assertNotIn('since_id=', responses.calls[-1].request.url)
+        self.assertEqual(len(stream), 16)
+        self.assertNotIn(deleted_id, [item.id for item in stream])
+        self.assertGreater(cache.get(self.cache_key + ':full'), time.time() - 60)
+
+        with override_settings(WAGTAIL_SOCIALFEED_FULL_REFRESH_INTERVAL=None):
+            cache.set(self.cache_key + ':full', time.time() - 3601)
+            self.stream._refresh(self.feedconfig, previous=stream)
+            self.assertIn('since_id=', responses.calls[-1].request.url)
+
     @feed_response('twitter')
     def test_without_cache(self, feed):
         self.assertIsNone(cache.get(self.cache_key))
@@ -133,6 +241,267 @@ class TwitterFeedTest(TestCase):
         self.assertIsNone(cache.get(self.cache_key))
         self.assertEqual(len(stream), 17)
 
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_KEEP_FIELDS={
+        'twitter': ['lang', 'user.id', 'entities.user_mentions.screen_name',
+                    'extended_entities.media.media_url']})
+    def test_keep_fields(self, feed):
+        stream = self.stream.get_items(config=self.feedconfig, use_cache=False)
+        self.assertEqual(stream[0].original_data, {
+            'lang': 'en',
+            'user': {'id': 2253779814},
+            'entities': {'user_mentions': [{'screen_name': 'snipcart'}]},
+        })
+        self.assertEqual(stream[-1].entities,
+                         {'user_mentions': [{'screen_name': 'GabeAnzelini'}]})
+        self.assertEqual(stream[-1].extended_entities['media'][0], {
+            'media_url': 'http://pbs.twimg.com/media/CnpYVx0UkAEdCpU.jpg'})
+        with self.assertRaises(AttributeError):
+            stream[0].in_reply_to_user_id
+
+        # The fields of the item itself are not affected
+        self.assertEqual(stream[0].text, feed[0]['text'])
+        self.assertIsNotNone(stream[-1].image_dict)
+
+    @feed_response('twitter')
+    @override_settings(
+        WAGTAIL_SOCIALFEED_CACHE_ORIGINAL_FIELDS={'twitter': ['in_reply_to_user_id', 'user.id']},
+        WAGTAIL_SOCIALFEED_CACHE_COMPRESS_THRESHOLD=1024)
+    def test_cache_payload(self, feed):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.stream.get_items(config=self.feedconfig)
+        self.assertTrue(issubclass(caught[0].category, DeprecationWarning))
+        payload = cache.get(self.cache_key)['items']
+        cache_format, compressed, body, size = payload
+        self.assertEqual(cache_format, CACHE_FORMAT)
+        self.assertTrue(compressed)
+        # The size of the rows is the one before compression
+        self.assertEqual(get_payload_size(payload), len(zlib.decompress(body)))
+        self.assertLess(len(body), size)
+
+        stream = self.stream.get_items(config=self.feedconfig)
+        self.assertEqual(len(stream), 17)
+        self.assertIsInstance(stream[0], TwitterFeedItem)
+        self.assertEqual(
+            stream[0].posted,
+            datetime.datetime(2016, 9, 23, 8, 28, 16, tzinfo=timezone.utc))
+        # Projected like `KEEP_FIELDS` does
+        self.assertEqual(stream[0].original_data,
+                         {'in_reply_to_user_id': 1252591452,
+                          'user': {'id': 2253779814}})
+
+    @feed_response('twitter')
+    def test_cache_payload_format_mismatch(self, feed):
+        self.stream.get_items(config=self.feedconfig)
+        entry = cache.get(self.cache_key)
+        entry['items'] = (CACHE_FORMAT - 1, ) + entry['items'][1:]
+        cache.set(self.cache_key, entry)
+
+        # Treated as a miss, so the entry is replaced
+        self.assertEqual(len(self.stream.get_items(config=self.feedconfig)), 17)
+        self.assertEqual(cache.get(self.cache_key)['items'][0], CACHE_FORMAT)
+
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_LOCAL_CACHE_MAX_ENTRIES=10)
+    def test_local_cache(self, feed):
+        self.stream.get_items(config=self.feedconfig)
+        # Now it's in the local cache as well
+        self.stream.get_items(config=self.feedconfig)
+
+        # Changing the shared entry, but not its version, goes unnoticed
+        entry = cache.get(self.cache_key)
+        cache.set(self.cache_key, dict(entry, items=encode_items([])))
+        self.assertEqual(len(self.stream.get_items(config=self.feedconfig)), 17)
+
+        # A new version invalidates the local copy
+        cache.set_many({
+            self.cache_key: dict(entry, version='new', items=encode_items([])),
+            self.cache_key + ':version': 'new',
+        })
+        self.assertEqual(len(self.stream.get_items(config=self.feedconfig)), 0)
+
+    @feed_response('twitter')
+    def test_iter_items(self, feed):
+        self.stream.get_items(config=self.feedconfig)
+
+        with count_conversions(TwitterFeedItem) as converted:
+            items = self.stream.iter_items(config=self.feedconfig)
+            first = next(items)
+            self.assertEqual(len(converted), 1)
+            self.assertEqual(len(self.stream.get_items(config=self.feedconfig, limit=5)), 5)
+            self.assertEqual(len(converted), 6)
+        self.assertIsInstance(first, TwitterFeedItem)
+
+    @feed_response('twitter')
+    def test_get_lazy_items(self, feed):
+        expected = self.stream.get_items(config=self.feedconfig)
+
+        with count_conversions(TwitterFeedItem) as converted:
+            items = self.stream.get_lazy_items(config=self.feedconfig)
+            self.assertEqual(len(items), 17)
+            self.assertEqual(len(converted), 0)
+            self.assertEqual([item.id for item in items[5:10]],
+                             [item.id for item in expected[5:10]])
+            self.assertEqual(items[-1].id, expected[-1].id)
+            self.assertEqual(len(converted), 6)
+        self.assertEqual([item.id for item in items],
+                         [item.id for item in expected])
+
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_CACHE_STALE_DURATION=60)
+    def test_stale_while_revalidate(self, feed):
+        self.stream.get_items(config=self.feedconfig)
+
+        # Let the cached entry expire, without it being removed
+        entry = cache.get(self.cache_key)
+        entry['expires'] = time.time() - 1
+        cache.set(self.cache_key, entry)
+
+        refreshed = []
+        self.stream._refresh_in_background = \
+            lambda *args, **kwargs: refreshed.append(args + (kwargs['previous'], ))
+        stream = self.stream.get_items(config=self.feedconfig)
+
+        # The stale data is returned and a refresh is scheduled
+        self.assertEqual(len(stream), 17)
+        self.assertEqual(len(refreshed), 1)
+        config, query_string, previous = refreshed[0]
+        self.assertEqual(config, self.feedconfig)
+        self.assertEqual([item.id for item in previous],
+                         [item.id for item in stream])
+
+        del self.stream._refresh_in_background
+        self.stream._refresh_in_background(self.feedconfig).join()
+        self.assertGreater(cache.get(self.cache_key)['expires'], time.time())
+
+        # While another worker holds the lock no extra refresh is scheduled
+        entry['expires'] = time.time() - 1
+        cache.set(self.cache_key, entry)
+        cache.add(self.cache_key + ':lock', True)
+        self.stream._refresh_in_background = \
+            lambda *args, **kwargs: refreshed.append(args)
+        self.stream.get_items(config=self.feedconfig)
+        self.assertEqual(len(refreshed), 1)
+
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_PERSISTENT_STORE=True)
+    def test_persistent_store(self, feed):
+        stream = self.stream.get_items(config=self.feedconfig)
+        self.assertEqual(self.feedconfig.stored_items.count(), 17)
+
+        # The cache got flushed
+        cache.clear()
+        refreshed = []
+        self.stream._refresh_in_background = \
+            lambda *args, **kwargs: refreshed.append(args)
+
+        with self.assertNumQueries(1):
+            stored = self.stream.get_items(config=self.feedconfig)
+        self.assertEqual([item.id for item in stored],
+                         [item.id for item in stream])
+        self.assertEqual(stored[0].posted, stream[0].posted)
+        self.assertEqual(stored[0].in_reply_to_user_id, 1252591452)
+
+        # The stored items are cached as stale data and get refreshed
+        self.assertEqual(len(refreshed), 1)
+        self.assertIsNotNone(cache.get(self.cache_key))
+        self.assertIsNone(self.stream.get_refreshed_at(self.feedconfig))
+
+    @override_settings(WAGTAIL_SOCIALFEED_CACHE_READ_ONLY=True)
+    def test_read_only(self):
+        # Nothing cached and not allowed to fetch it
+        self.assertEqual(self.stream.get_items(config=self.feedconfig), [])
+
+        item = FeedItem(id=1, type='twitter', text='Hello', posted=None,
+                        image_dict=None)
+        entry = {'expires': time.time() - 1, 'items': encode_items([item])}
+        cache.set(self.cache_key, entry)
+
+        # Stale data is served without refreshing it
+        stream = self.stream.get_items(config=self.feedconfig)
+        self.assertEqual([item.text for item in stream], ['Hello'])
+        self.assertIsNone(cache.get(self.cache_key + ':lock'))
+
+    def test_wait_for_refresh_lock(self):
+        # Simulate another worker which is fetching the feed
+        cache.add(self.cache_key + ':lock', True)
+        item = FeedItem(id=1, type='twitter', text='Hello', posted=None,
+                        image_dict=None)
+        # An entry from an older release, which can't be decoded anymore
+        cache.set_many({self.cache_key: {'expires': time.time() + 60,
+                                         'items': (0, False, b'', 0)},
+                        self.cache_key + ':version': 'old'})
+        entry = {'expires': time.time() + 60, 'version': 'new',
+                 'items': encode_items([item])}
+        timer = threading.Timer(0.3, cache.set_many, args=({
+            self.cache_key: entry, self.cache_key + ':version': 'new'},))
+        timer.start()
+
+        decoded = []
+        decode_entry = self.stream._decode_entry
+
+        def counting_decode(entry):
+            if entry is not None:
+                decoded.append(entry)
+            return decode_entry(entry)
+        self.stream._decode_entry = counting_decode
+
+        stream = self.stream.get_items(config=self.feedconfig)
+        timer.join()
+        self.assertEqual(len(stream), 1)
+        self.assertEqual(stream[0].text, 'Hello')
+        # While waiting only the version is polled; the entry is read once
+        # before waiting and once after the other worker stored it
+        self.assertEqual(len(decoded), 2)
+
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_CACHE_LOCK_WAIT=0.2)
+    def test_wait_for_refresh_lock_timeout(self, feed):
+        # The other worker is still fetching the feed
+        cache.add(self.cache_key + ':lock', True)
+        stream = self.stream.get_items(config=self.feedconfig)
+        self.assertEqual(stream, [])
+        self.assertEqual(len(responses.calls), 0)
+
+        # The other worker died and its lock expired
+        cache.add(self.cache_key + ':lock', True)
+        timer = threading.Timer(0.1, cache.delete, args=(self.cache_key + ':lock',))
+        timer.start()
+        stream = self.stream.get_items(config=self.feedconfig)
+        timer.join()
+        self.assertEqual(len(stream), 17)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertIsNotNone(cache.get(self.cache_key))
+
+    @responses.activate
+    @override_settings(WAGTAIL_SOCIALFEED_CACHE_LOCK_WAIT=0.1)
+    def test_slow_refresh_single_fetch(self):
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            body = feed_file.read()
+
+        def callback(request):
+            # Slower than the waiting workers wait
+            time.sleep(0.5)
+            return (200, {}, body)
+        responses.add_callback(
+            responses.GET, re.compile('https?://api.twitter.com/.*'),
+            callback=callback, content_type='application/json')
+
+        results = []
+
+        def get_items():
+            results.append(self.stream.get_items(config=self.feedconfig))
+        threads = [threading.Thread(target=get_items) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(sorted(len(stream) for stream in results),
+                         [0, 0, 0, 0, 17])
+
 
 def _tamper_date(resp):
     """
@@ -181,6 +550,43 @@ class InstagramFeedTest(TestCase):
         # The following data is not explicitly stored, but should still be accessible
         self.assertEqual(stream[0].code, "Bbh7J7JlCRn")
 
+    @responses.activate
+    def test_conditional_refresh(self):
+        with open('tests/fixtures/instagram.json', 'r') as feed_file:
+            body = feed_file.read()
+        etag = {'value': '"v1"'}
+
+        def callback(request):
+            if request.headers.get('If-None-Match') == etag['value']:
+                return (304, {}, '')
+            return (200, {'ETag': etag['value']}, body)
+        responses.add_callback(
+            responses.GET, re.compile('https?://www.instagram.com/.*'),
+            callback=callback, content_type='application/json')
+
+        self.stream.get_items(config=self.feedconfig)
+        self.assertNotIn('If-None-Match', responses.calls[0].request.headers)
+        entry = cache.get(self.cache_key)
+
+        # Not modified: the cached entry just gets a new expiry
+        stream = self.stream.refresh(self.feedconfig)
+        self.assertEqual(responses.calls[1].request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(responses.calls[1].response.status_code, 304)
+        self.assertEqual(len(stream), 12)
+        extended = cache.get(self.cache_key)
+        self.assertIs(type(extended['items']), type(entry['items']))
+        self.assertEqual(extended['items'], entry['items'])
+        self.assertGreater(extended['expires'], entry['expires'])
+        self.assertNotEqual(extended['version'], entry['version'])
+        self.assertEqual(cache.get(self.cache_key + ':version'), extended['version'])
+
+        # Modified
+        etag['value'] = '"v2"'
+        stream = self.stream.refresh(self.feedconfig)
+        self.assertEqual(responses.calls[2].response.status_code, 200)
+        self.assertEqual(len(stream), 12)
+        self.assertEqual(cache.get(self.cache_key + ':validators'), {'ETag': '"v2"'})
+
     @feed_response('instagram', modifier=_tamper_date)
     def test_feed_unexpected_date_format(self, feed):
         stream = self.stream.get_items(config=self.feedconfig)
@@ -222,6 +628,41 @@ class FacebookFeedTest(TestCase):
         # The following data is not explicitly stored, but should still be accessible
         self.assertEqual(stream[0].icon, "https://www.facebook.com/images/icons/photo.gif")
 
+    @feed_response('facebook')
+    def test_incremental_refresh(self, feed):
+        previous = self.stream.get_items(config=self.feedconfig)
+        stream = self.stream._refresh(self.feedconfig, previous=previous)
+
+        self.assertIn('since=1475592489', responses.calls[1].request.url)
+        # Nothing new, so nothing changed
+        self.assertEqual([item.id for item in stream],
+                         [item.id for item in previous])
+
+    @responses.activate
+    def test_incremental_refresh_paging(self):
+        with open('tests/fixtures/facebook.json', 'r') as feed_file:
+            page = json.loads(feed_file.read())
+        self.stream._store_items(
+            self.feedconfig, None,
+            [FacebookFeedItem.from_raw(raw) for raw in page['data'][2:]])
+
+        # The 'next' links drop the `since` parameter, so the pages after
+        # the first one go on with the history that is cached already
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*since=)https?://graph.facebook.com.*'),
+                      json=dict(page, data=page['data'][:2]), status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?!.*since=)https?://graph.facebook.com.*'),
+                      json=page, status=200)
+
+        stream = self.stream.refresh(self.feedconfig)
+
+        # Paging stops at the first post that was cached before
+        self.assertEqual(len(responses.calls), 2)
+        # (trimmed to the length of the cached list)
+        self.assertEqual([item.id for item in stream],
+                         [raw['id'] for raw in page['data'][:23]])
+
     @responses.activate
     @override_settings(WAGTAIL_SOCIALFEED_SEARCH_MAX_HISTORY=datetime.timedelta(weeks=500))
     def test_search(self):
@@ -257,3 +698,105 @@ class FacebookFeedTest(TestCase):
         self.assertEqual(len(stream), 2)
         for s in stream:
             self.assertIn('tutorials', s.text)
+
+    def _add_batch_response(self, answer):
+        """
+        Answer the batch requests with `answer`, which gets the requests of
+        a round and returns the (status, body) of each of them.
+        """
+        rounds = []
+
+        def callback(request):
+            body = request.body
+            if isinstance(body, bytes):
+                body = body.decode('utf-8')
+            batch = json.loads(parse_qs(body)['batch'][0])
+            rounds.append(batch)
+            return (200, {}, json.dumps([
+                {'code': code, 'headers': [], 'body': json.dumps(data)}
+                for code, data in answer(batch)]))
+
+        responses.add_callback(
+            responses.POST, re.compile('https?://graph.facebook.com.*'),
+            callback=callback, content_type='application/json')
+        return rounds
+
+    @responses.activate
+    def test_refresh_many(self):
+        with open('tests/fixtures/facebook.json', 'r') as feed_file:
+            page = json.loads(feed_file.read())
+        rounds = self._add_batch_response(
+            lambda batch: [(200, page)] * len(batch))
+        other = SocialFeedConfigurationFactory.create(
+            source='facebook', username='other')
+
+        self.assertTrue(self.stream.batch_refresh)
+        results = self.stream.refresh_many([self.feedconfig, other])
+
+        # All the feeds are fetched in a single round trip
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(
+            [request['relative_url'].split('?')[0] for request in rounds[0]],
+            ['{}/posts'.format(self.feedconfig.username), 'other/posts'])
+        for config in (self.feedconfig, other):
+            self.assertEqual(len(results[config.id]), 25)
+            self.assertEqual(
+                len(self.stream.get_items(config, use_cache=True)), 25)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_refresh_many_failing_conversion(self):
+        with open('tests/fixtures/facebook.json', 'r') as feed_file:
+            page = json.loads(feed_file.read())
+        broken = dict(page, data=[dict(page['data'][0], type='unknown')])
+        self._add_batch_response(lambda batch: [(200, broken), (200, page)])
+        other = SocialFeedConfigurationFactory.create(
+            source='facebook', username='other')
+
+        results = self.stream.refresh_many([self.feedconfig, other])
+
+        # The feed after the failing one is refreshed all the same
+        self.assertIsInstance(results[self.feedconfig.id], ValueError)
+        self.assertIsNone(self.stream.get_refreshed_at(self.feedconfig))
+        self.assertEqual(len(results[other.id]), 25)
+        self.assertIsNotNone(self.stream.get_refreshed_at(other))
+
+    @responses.activate
+    @override_settings(WAGTAIL_SOCIALFEED_MAX_ITEMS=100)
+    def test_refresh_many_incremental(self):
+        with open('tests/fixtures/facebook.json', 'r') as feed_file:
+            page = json.loads(feed_file.read())
+        other = SocialFeedConfigurationFactory.create(
+            source='facebook', username='other')
+        self.stream._store_items(
+            self.feedconfig, None,
+            [FacebookFeedItem.from_raw(raw) for raw in page['data'][2:]])
+
+        def answer(batch):
+            for request in batch:
+                if request['relative_url'].startswith('other'):
+                    yield (400, {'error': {'message': "Unknown user",
+                                           'type': 'GraphMethodException',
+                                           'code': 100}})
+                elif 'since=' in request['relative_url']:
+                    yield (200, dict(page, data=page['data'][:2]))
+                else:
+                    # The 'next' links go on with the cached history
+                    yield (200, page)
+        rounds = self._add_batch_response(answer)
+
+        results = self.stream.refresh_many([self.feedconfig, other])
+
+        self.assertIn('since=1474399175', rounds[0][0]['relative_url'])
+        # The next page of the incremental refresh is loaded as well, up to
+        # the posts that were cached before
+        self.assertEqual(len(rounds), 2)
+        self.assertEqual(len(rounds[1]), 1)
+        self.assertIn('until=1441902467', rounds[1][0]['relative_url'])
+        self.assertFalse(rounds[1][0]['relative_url'].startswith('http'))
+
+        self.assertEqual([item.id for item in results[self.feedconfig.id]],
+                         [raw['id'] for raw in page['data']])
+        # A failing feed doesn't affect the others
+        self.assertIsInstance(results[other.id], Exception)
+        self.assertIsNone(self.stream.get_refreshed_at(other))
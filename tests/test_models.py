@@ -6,9 +6,13 @@ Tests for `wagtailsocialfeed.models`.
 """
 from __future__ import unicode_literals
 
-from django.test import RequestFactory, TestCase
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase
 from django.utils import six
 
+from wagtailsocialfeed.models import ModeratedItem
+from wagtailsocialfeed.utils import get_feed_items
 from wagtailsocialfeed.utils.feed.factory import FeedFactory
 
 from . import feed_response
@@ -45,6 +49,95 @@ class ModeratedItemTest(TestCase):
             six.text_type(self.item),
             "ModeratedItem<twitter> (779235925826138112 posted 2016-09-23 08:28:16+00:00)")
 
+    def test_get_or_create_for(self):
+        post = self.item.get_content().serialize()
+        item, created = self.feedconfig.moderated_items.get_or_create_for(post)
+        self.assertFalse(created)
+        self.assertEqual(item.pk, self.item.pk)
+
+        # The same post can be moderated for another configuration
+        other_config = SocialFeedConfigurationFactory(
+            source='twitter', username='wagtail')
+        item, created = other_config.moderated_items.get_or_create_for(post)
+        self.assertTrue(created)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ModeratedItem.objects.create(
+                config=self.feedconfig, posted=self.item.posted,
+                external_id=self.item.external_id, content=post)
+
+    def test_display_fields(self):
+        self.assertEqual(self.item.type, 'twitter')
+        self.assertTrue(self.item.text.startswith('@snipcart'))
+        self.assertIsNone(self.item.image)
+
+        item = get_feed_items(self.feedconfig)[0]
+        with self.assertNumQueries(0):
+            item.text, item.posted, item.image
+        self.assertFalse(hasattr(item, '_feeditem'))
+
+        # The original data is decoded on demand
+        self.assertEqual(item.lang, 'en')
+        self.assertEqual(item.original_data['lang'], 'en')
+        with self.assertRaises(AttributeError):
+            item.unknown
+
+    @feed_response('twitter')
+    def test_image(self, tweets):
+        feed = FeedFactory.create('twitter')
+        post = [item for item in feed.get_items(self.feedconfig) if item.image][0]
+        self.feedconfig.moderated_items.get_or_create_for(post.serialize())
+
+        item = self.feedconfig.moderated_items.get(external_id=post.id)
+        image = item.image
+        self.assertTrue(image)
+        self.assertEqual(image['thumb']['url'], post.image['thumb']['url'])
+        self.assertFalse(hasattr(item, '_feeditem'))
+
+        # The other sizes are decoded on demand
+        self.assertEqual(image['large'], post.image['large'])
+        # Including the full data of the thumbnail
+        self.assertEqual(image['thumb'], post.image['thumb'])
+        self.assertEqual(item.image.get('small'), post.image['small'])
+        self.assertEqual(sorted(item.image), sorted(post.image))
+        self.assertIsNone(item.image.get('unknown'))
+
+    def test_blank_type(self):
+        item = ModeratedItem()
+        self.assertFalse(hasattr(item, 'unknown'))
+        with self.assertRaises(AttributeError):
+            item.lang
+
+    def test_broken_content(self):
+        item = ModeratedItem(type='twitter', content='{broken')
+        # Not hidden as a missing attribute
+        with self.assertRaises(ValueError):
+            hasattr(item, 'lang')
+
+
+class StoredItemTest(TestCase):
+    @feed_response('twitter')
+    def setUp(self, tweets):
+        self.feedconfig = SocialFeedConfigurationFactory(
+            source='twitter', username='wagtailcms')
+        feed = FeedFactory.create('twitter')
+        self.items = feed.get_items(self.feedconfig)
+
+    def test_replace_with(self):
+        self.feedconfig.stored_items.replace_with(self.items)
+        self.assertEqual(self.feedconfig.stored_items.count(), 17)
+
+        self.feedconfig.stored_items.replace_with(self.items[:3])
+        self.assertEqual(
+            list(self.feedconfig.stored_items.values_list('external_id', flat=True)),
+            [item.id for item in self.items[:3]])
+
+        item = self.feedconfig.stored_items.first()
+        self.assertEqual(
+            six.text_type(item),
+            "StoredItem<twitter> (779235925826138112 posted 2016-09-23 08:28:16+00:00)")
+        self.assertEqual(item.get_content().text, self.items[0].text)
+
 
 class SocialFeedPageTest(TestCase):
     def setUp(self):
@@ -85,3 +178,33 @@ class SocialFeedPageTest(TestCase):
         resp.render()
         self.assertIn('feed', resp.context_data)
         self.assertEqual(len(resp.context_data['feed']), 3)
+
+
+class MigrationTest(TransactionTestCase):
+    migrate_from = ('wagtailsocialfeed', '0006_fill_moderateditem_display_fields')
+    migrate_to = ('wagtailsocialfeed', '0007_moderateditem_indexes')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        # Back to the latest state for the other tests
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes(
+            'wagtailsocialfeed')[0])
+
+    def test_remove_duplicates(self):
+        apps = self.migrate(self.migrate_from)
+        Config = apps.get_model('wagtailsocialfeed', 'SocialFeedConfiguration')
+        ModeratedItem = apps.get_model('wagtailsocialfeed', 'ModeratedItem')
+        config = Config.objects.create(source='twitter', username='wagtailcms')
+        for posted in ('2016-01-01T00:00:00Z', '2016-01-02T00:00:00Z'):
+            ModeratedItem.objects.create(
+                config=config, external_id='1', posted=posted,
+                content='{}')
+
+        apps = self.migrate(self.migrate_to)
+        ModeratedItem = apps.get_model('wagtailsocialfeed', 'ModeratedItem')
+        self.assertEqual(ModeratedItem.objects.filter(external_id='1').count(), 1)
@@ -1,8 +1,29 @@
-from django.test import TestCase
+import datetime
+import json
+import re
+import threading
+import time
+
+import responses
+from dateutil import parser as dateparser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six.moves import BaseHTTPServer
 
 from wagtailsocialfeed.models import SocialFeedConfiguration
-from wagtailsocialfeed.utils import get_feed_items, get_feed_items_mix
+from wagtailsocialfeed.utils import (get_feed_items, get_feed_items_mix,
+                                     merge_feed_items)
+from wagtailsocialfeed.utils.cache import LocalCache
+from wagtailsocialfeed.utils import clients, http, serializer
+from wagtailsocialfeed.utils.dates import parse_iso_date, parse_twitter_date
+from wagtailsocialfeed.utils.feed import FeedError, FeedItem
+from wagtailsocialfeed.utils.feed.facebook import FacebookFeedQuery
 from wagtailsocialfeed.utils.feed.factory import FeedFactory
+from wagtailsocialfeed.utils.feed.instagram import InstagramFeedQuery
+from wagtailsocialfeed.utils.feed.twitter import TwitterFeedQuery
 
 from . import feed_response
 from .factories import SocialFeedConfigurationFactory
@@ -11,6 +32,7 @@ from .factories import SocialFeedConfigurationFactory
 class UtilTest(TestCase):
     """Test util methods."""
     def setUp(self):
+        cache.clear()
         self.feedconfig = SocialFeedConfigurationFactory.create(
             source='twitter',
             username='someuser')
@@ -20,6 +42,32 @@ class UtilTest(TestCase):
         items = get_feed_items(self.feedconfig)
         self.assertEquals(len(items), len(tweets))
 
+    @feed_response(['twitter', 'instagram'])
+    def test_get_feed_items_moderated_queries(self, tweets, instagram_posts):
+        """The amount of queries doesn't depend on the amount of items."""
+        instagramconfig = SocialFeedConfigurationFactory.create(
+            source='instagram', username='someuser', moderated=True)
+        self.feedconfig.moderated = True
+        self.feedconfig.save()
+        template = Template(
+            "{% for item in feed %}{{ item.text }}{{ item.image.thumb.url }}"
+            "{{ item.config.source }}{{ item.get_content.type }}"
+            "{{ item.lang }}{% endfor %}")
+
+        tweet_items = FeedFactory.create('twitter').get_items(self.feedconfig)
+        instagram_items = FeedFactory.create('instagram').get_items(instagramconfig)
+        configs = list(SocialFeedConfiguration.objects.all())
+        for size in (2, 8):
+            for item in tweet_items[:size]:
+                self.feedconfig.moderated_items.get_or_create_for(item.serialize())
+            for item in instagram_items[:size]:
+                instagramconfig.moderated_items.get_or_create_for(item.serialize())
+
+            with self.assertNumQueries(1):
+                template.render(Context({'feed': get_feed_items(self.feedconfig)}))
+            with self.assertNumQueries(2):
+                template.render(Context({'feed': get_feed_items_mix(configs)}))
+
     @feed_response(['twitter', 'instagram'])
     def test_get_feed_items_mix(self, tweets, instagram_posts):
         items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
@@ -67,3 +115,357 @@ class UtilTest(TestCase):
                 self.assertLessEqual(item.posted, last_date)
             last_date = item.posted
         self.assertEquals(len([i for i in items if i.type == 'instagram']), 3)
+
+    @feed_response(['twitter', 'instagram'])
+    def test_get_feed_items_mix_limit(self, tweets, instagram_posts):
+        instagramconfig = SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='someuser',
+            moderated=True)
+        instagram_items = FeedFactory.create('instagram').get_items(instagramconfig)
+        for item in instagram_items:
+            instagramconfig.moderated_items.get_or_create_for(
+                item.serialize())
+
+        items = get_feed_items_mix(SocialFeedConfiguration.objects.all(),
+                                   limit=5)
+        all_items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
+        self.assertEquals(len(all_items), len(tweets) + len(instagram_posts))
+        self.assertEquals([i.posted for i in items],
+                          [i.posted for i in all_items[:5]])
+
+    @feed_response(['twitter', 'instagram'])
+    def test_get_feed_items_mix_persistent_store(self, tweets, instagram_posts):
+        instagramconfig = SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='someuser')
+        for config in (self.feedconfig, instagramconfig):
+            items = FeedFactory.create(config.source).get_items(config)
+            config.stored_items.replace_with(items)
+        all_items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
+
+        cache.clear()
+        with self.settings(WAGTAIL_SOCIALFEED_PERSISTENT_STORE=True,
+                           WAGTAIL_SOCIALFEED_CACHE_READ_ONLY=True):
+            with self.assertNumQueries(2):
+                items = get_feed_items_mix(SocialFeedConfiguration.objects.all(),
+                                           limit=5)
+        self.assertEquals([i.id for i in items],
+                          [i.id for i in all_items[:5]])
+
+    @responses.activate
+    def test_get_feed_items_mix_failing_source(self):
+        """A failing source should not affect the other sources."""
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            tweets = json.loads("".join(feed_file.readlines()))
+        responses.add(responses.GET,
+                      re.compile('https?://api.twitter.com/.*'),
+                      json=tweets, status=200)
+        responses.add(responses.GET,
+                      re.compile('https?://www.instagram.com/.*'),
+                      status=500)
+        SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='someuser')
+
+        items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
+        self.assertEquals(len(items), len(tweets))
+
+    @responses.activate
+    @override_settings(WAGTAIL_SOCIALFEED_MIX_TIMEOUT=0.2)
+    def test_get_feed_items_mix_timeout(self):
+        """A slow source is left out once the deadline has passed."""
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            tweets = json.loads("".join(feed_file.readlines()))
+        responses.add(responses.GET,
+                      re.compile('https?://api.twitter.com/.*'),
+                      json=tweets, status=200)
+
+        def slow_response(request):
+            time.sleep(1)
+            return (500, {}, '')
+
+        responses.add_callback(responses.GET,
+                               re.compile('https?://www.instagram.com/.*'),
+                               callback=slow_response)
+        SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='someuser')
+
+        start = time.time()
+        items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
+        self.assertLess(time.time() - start, 1)
+        self.assertEquals(len(items), len(tweets))
+
+    @responses.activate
+    @override_settings(WAGTAIL_SOCIALFEED_MIX_TIMEOUT=0.2,
+                       WAGTAIL_SOCIALFEED_MIX_MAX_WORKERS=1)
+    def test_get_feed_items_mix_timeout_cancel(self):
+        """The fetches which didn't start before the deadline are cancelled."""
+        calls = []
+
+        def slow_response(request):
+            calls.append(request.url)
+            time.sleep(0.5)
+            return (500, {}, '')
+
+        responses.add_callback(responses.GET,
+                               re.compile(r'https?://www.instagram.com/.*'),
+                               callback=slow_response)
+        for i in range(3):
+            SocialFeedConfigurationFactory.create(source='instagram')
+
+        self.assertEqual(get_feed_items_mix(SocialFeedConfiguration.objects.all()), [])
+        # Give the worker the time to pick up any queued fetches
+        time.sleep(1.2)
+        self.assertEqual(len(calls), 1)
+
+    @feed_response('instagram')
+    @override_settings(WAGTAIL_SOCIALFEED_CACHE_LOCK_WAIT=5)
+    def test_get_feed_items_mix_no_waiting(self, instagram_posts):
+        """The pool doesn't wait for a feed another worker is fetching."""
+        SocialFeedConfigurationFactory.create(
+            source='instagram',
+            username='someuser')
+        # Another worker is fetching the twitter feed
+        stream = FeedFactory.create('twitter')
+        cache.add(stream._get_cache_key(self.feedconfig) + ':lock', True)
+
+        start = time.time()
+        items = get_feed_items_mix(SocialFeedConfiguration.objects.all())
+        self.assertLess(time.time() - start, 1)
+        self.assertEquals(len(items), len(instagram_posts))
+
+
+def _item(id, *date_args):
+    posted = datetime.datetime(*date_args, tzinfo=timezone.utc) if date_args else None
+    return FeedItem(id=id, type='twitter', text='', posted=posted,
+                    image_dict=None)
+
+
+class MergeFeedItemsTest(TestCase):
+    def test_merge(self):
+        feed1 = [_item(1, 2017, 1, 5), _item(2, 2017, 1, 3), _item(3, 2017, 1, 1)]
+        feed2 = [_item(4, 2017, 1, 4), _item(5, 2017, 1, 2), _item(6)]
+        feed3 = []
+
+        items = list(merge_feed_items([feed1, feed2, feed3]))
+        self.assertEqual([i.id for i in items], ['1', '4', '2', '5', '3', '6'])
+
+    def test_limit(self):
+        def feed(*items):
+            for item in items:
+                yield item
+            raise AssertionError("Consumed more items than needed")
+
+        feed1 = feed(_item(1, 2017, 1, 5), _item(2, 2017, 1, 3))
+        feed2 = feed(_item(4, 2017, 1, 4), _item(5, 2017, 1, 2))
+
+        items = list(merge_feed_items([feed1, feed2], limit=3))
+        self.assertEqual([i.id for i in items], ['1', '4', '2'])
+
+
+class LocalCacheTest(TestCase):
+    def setUp(self):
+        self.cache = LocalCache(max_entries=2, max_bytes=100, ttl=60)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('a', 1))
+        self.cache.set('a', 1, 'value', 10)
+        self.assertEqual(self.cache.get('a', 1), 'value')
+
+    def test_version(self):
+        self.cache.set('a', 1, 'value', 10)
+        self.assertIsNone(self.cache.get('a', 2))
+        # Outdated entries are dropped
+        self.assertEqual(len(self.cache), 0)
+
+    def test_ttl(self):
+        self.cache.ttl = 0
+        self.cache.set('a', 1, 'value', 10)
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get('a', 1))
+
+    def test_max_entries(self):
+        self.cache.set('a', 1, 'a', 10)
+        self.cache.set('b', 1, 'b', 10)
+        self.cache.get('a', 1)
+        self.cache.set('c', 1, 'c', 10)
+
+        # 'b' is the least recently used
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('b', 1))
+        self.assertEqual(self.cache.get('a', 1), 'a')
+        self.assertEqual(self.cache.get('c', 1), 'c')
+
+    def test_max_bytes(self):
+        self.cache.set('a', 1, 'a', 60)
+        self.cache.set('b', 1, 'b', 60)
+        self.assertIsNone(self.cache.get('a', 1))
+        self.assertEqual(self.cache.get('b', 1), 'b')
+
+        # Too big to be cached at all
+        self.cache.set('c', 1, 'c', 101)
+        self.assertIsNone(self.cache.get('c', 1))
+        self.assertEqual(self.cache.get('b', 1), 'b')
+
+
+class DatesTest(TestCase):
+    def test_parse_twitter_date(self):
+        for value in ('Fri Sep 23 08:28:16 +0000 2016',
+                      'Fri Sep 23 10:28:16 +0200 2016',
+                      'Fri Sep 23 03:28:16 -0500 2016'):
+            self.assertEqual(parse_twitter_date(value), dateparser.parse(value))
+            self.assertEqual(parse_twitter_date(value),
+                             datetime.datetime(2016, 9, 23, 8, 28, 16,
+                                               tzinfo=timezone.utc))
+        # Falls back to dateutil
+        self.assertEqual(parse_twitter_date('2016-09-23 08:28:16Z'),
+                         datetime.datetime(2016, 9, 23, 8, 28, 16,
+                                           tzinfo=timezone.utc))
+
+    def test_parse_iso_date(self):
+        for value in ('2015-07-09T16:18:38+0000',
+                      '2015-07-09T16:18:38+00:00',
+                      '2015-07-09T16:18:38.250000+00:00',
+                      '2015-07-09T18:18:38+02:00',
+                      '2015-07-09T16:18:38Z',
+                      # Falls back to dateutil
+                      '2015-07-09 16:18:38 UTC'):
+            self.assertEqual(parse_iso_date(value), dateparser.parse(value))
+
+    def test_memoize(self):
+        value = 'Fri Sep 23 08:28:16 +0000 2016'
+        self.assertIs(parse_twitter_date(value), parse_twitter_date(value))
+
+
+class SerializerTest(TestCase):
+    def setUp(self):
+        self.data = {
+            'id': '1',
+            'text': 'Caf\xe9 <a href="https://wagtail.io/">wagtail</a>',
+            'posted': datetime.datetime(2016, 9, 23, 8, 28, 16, 250000,
+                                        tzinfo=timezone.utc),
+            'original_data': {'id': 779235925826138112, 'lang': 'en'},
+        }
+        self.expected = dict(self.data, posted='2016-09-23T08:28:16.250000+00:00')
+
+    def get_backends(self):
+        backends = []
+        for name in serializer.AUTO_BACKENDS:
+            try:
+                backends.append(serializer.get_backend(name))
+            except ImproperlyConfigured:
+                pass
+        return backends
+
+    def test_backends(self):
+        for dumps, loads in self.get_backends():
+            value = dumps(self.data)
+            self.assertEqual(json.loads(value), self.expected)
+            self.assertEqual(loads(value), self.expected)
+            self.assertEqual(loads(json.dumps(self.expected)), self.expected)
+
+    def test_setting(self):
+        with override_settings(WAGTAIL_SOCIALFEED_JSON_BACKEND='json'):
+            self.assertEqual(json.loads(serializer.dumps(self.data)),
+                             self.expected)
+        with override_settings(WAGTAIL_SOCIALFEED_JSON_BACKEND='simplejson2'):
+            with self.assertRaises(ImproperlyConfigured):
+                serializer.dumps(self.data)
+
+
+class HttpTest(TestCase):
+    def test_get_session(self):
+        session = http.get_session()
+        self.assertIs(http.get_session(), session)
+
+        adapter = session.get_adapter('https://www.instagram.com/')
+        self.assertEqual(adapter._pool_maxsize, 10)
+        self.assertEqual(adapter.max_retries.total, 2)
+
+        with override_settings(WAGTAIL_SOCIALFEED_HTTP_POOL_SIZE=2):
+            other_session = http.get_session()
+            self.assertIsNot(other_session, session)
+            self.assertEqual(
+                other_session.get_adapter('https://www.instagram.com/')._pool_maxsize, 2)
+
+    @responses.activate
+    def test_get(self):
+        responses.add(responses.GET, 'https://www.instagram.com/wagtail/',
+                      json={}, status=200)
+        resp = http.get('https://www.instagram.com/wagtail/')
+        self.assertEqual(resp.json(), {})
+        self.assertIs(resp.connection, http.get_session().get_adapter(
+            'https://www.instagram.com/'))
+
+    def test_get_max_request_time(self):
+        # 3 attempts of 10 seconds, with 0.5 + 1 seconds of backoff
+        self.assertEqual(http.get_max_request_time(), 31.5)
+        with override_settings(WAGTAIL_SOCIALFEED_HTTP_RETRIES=0,
+                               WAGTAIL_SOCIALFEED_HTTP_TIMEOUT=5):
+            self.assertEqual(http.get_max_request_time(), 5)
+
+    @override_settings(WAGTAIL_SOCIALFEED_HTTP_RETRIES=1)
+    def test_server_error(self):
+        requests_seen = []
+
+        class ErrorHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_seen.append(self.path)
+                self.send_response(500)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), ErrorHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        url = 'http://127.0.0.1:{}/wagtail/'.format(server.server_address[1])
+
+        class ErrorFeedQuery(InstagramFeedQuery):
+            def _get_url(self, max_id=None):
+                return url
+
+        try:
+            # The last server error is returned once the retries run out
+            self.assertEqual(http.get(url).status_code, 500)
+            self.assertEqual(len(requests_seen), 2)
+            with self.assertRaises(FeedError):
+                ErrorFeedQuery('wagtail', None)._load()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @responses.activate
+    def test_conditional_headers(self):
+        responses.add(responses.GET, 'https://www.instagram.com/wagtail/',
+                      json={}, status=200, adding_headers={
+                          'ETag': '"abc"',
+                          'Last-Modified': 'Wed, 15 Nov 2017 21:55:44 GMT'})
+        validators = http.get_validators(http.get('https://www.instagram.com/wagtail/'))
+        self.assertEqual(http.get_conditional_headers(validators), {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Wed, 15 Nov 2017 21:55:44 GMT',
+        })
+        self.assertEqual(http.get_conditional_headers(None), {})
+
+
+class ClientsTest(TestCase):
+    def test_get_client(self):
+        client = clients.get_client(dict, (('token', 'abc'),))
+        self.assertIs(clients.get_client(dict, (('token', 'abc'),)), client)
+        self.assertIsNot(clients.get_client(dict, (('token', 'def'),)), client)
+
+        # Changing the settings resets the clients
+        with override_settings(WAGTAIL_SOCIALFEED_CACHE_DURATION=10):
+            self.assertIsNot(clients.get_client(dict, (('token', 'abc'),)), client)
+
+    def test_queries_share_client(self):
+        self.assertIs(TwitterFeedQuery('wagtailcms', None).twitter,
+                      TwitterFeedQuery('torchbox', None).twitter)
+        self.assertIs(FacebookFeedQuery('wagtailcms', None)._graph,
+                      FacebookFeedQuery('torchbox', None)._graph)
@@ -1,22 +1,30 @@
 from __future__ import unicode_literals
 
 import json
+import re
 
+import responses
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import force_text
 
 from bs4 import BeautifulSoup
 from wagtailsocialfeed.models import ModeratedItem
 from wagtailsocialfeed.utils.feed.factory import FeedFactory
+from wagtailsocialfeed.utils.feed.twitter import TwitterFeedItem
+from wagtailsocialfeed.views import get_stashed_posts, stash_posts
 
-from . import feed_response
+from . import count_conversions, feed_response
 from .factories import SocialFeedConfigurationFactory
 
 
 class ModerateTestMixin(object):
     def setUp(self):
+        cache.clear()
         self.feedconfig = SocialFeedConfigurationFactory.create(
             source='twitter',
             username='wagtailcms',
@@ -58,15 +66,21 @@ class ModerateViewTest(ModerateTestMixin, TestCase):
         self.assertEqual(resp.status_code, 200)
         soup = BeautifulSoup(resp.content, 'html.parser')
 
-        # The original post should be included to be used for
-        # moderated allow/remove
         rows = soup.tbody.find_all('tr')
 
         # Substract the columns from the first row/tweet
         columns = rows[0].find_all('td')
         post_id = tweets[0]['id']
-        self.assertEqual(columns[0].input['id'],
-                         'post_original_{}'.format(post_id))
+        self.assertEqual(columns[0].input['value'], str(post_id))
+        columns = columns[1:]
+
+        # The original post is kept on the server, to be used for
+        # moderated allow/remove
+        self.assertIsNone(columns[0].input)
+        self.assertEqual(
+            get_stashed_posts(self.feedconfig, [str(post_id)]),
+            {str(post_id): FeedFactory.create('twitter').get_items(
+                self.feedconfig)[0].serialize()})
 
         url_allow = reverse('wagtailsocialfeed:allow',
                             kwargs={'pk': self.feedconfig.id,
@@ -80,6 +94,98 @@ class ModerateViewTest(ModerateTestMixin, TestCase):
         self.assertEqual(allow_a_element['href'], url_allow)
         self.assertEqual(remove_a_element['href'], url_remove)
 
+    @feed_response('twitter')
+    @override_settings(WAGTAIL_SOCIALFEED_MODERATE_PAGE_SIZE=5)
+    def test_pagination(self, tweets):
+        self.client.login(username='admin', password='test')
+        self.feedconfig.moderated_items.get_or_create_for(
+            FeedFactory.create('twitter').get_items(self.feedconfig)[6].serialize())
+
+        # Only the cached posts of the page (and the oldest one, for the
+        # cursor) are converted
+        with count_conversions(TwitterFeedItem) as converted:
+            resp = self.client.get(self.url, {'p': 2})
+        self.assertEqual(len(converted), 6)
+
+        soup = BeautifulSoup(resp.content, 'html.parser')
+        rows = soup.tbody.find_all('tr')
+        self.assertEqual([row['data-post_id'] for row in rows],
+                         [str(tweet['id']) for tweet in tweets[5:10]])
+        # Only the moderated post is flagged as allowed
+        allowed = [row['data-post_id'] for row in rows
+                   if 'allowed' in row.find(attrs={'class': 'status'})['class']]
+        self.assertEqual(allowed, [str(tweets[6]['id'])])
+        self.assertIsNone(soup.find(attrs={'class': 'load-older'}))
+
+        # The last page offers to load older posts
+        resp = self.client.get(self.url, {'p': 4})
+        soup = BeautifulSoup(resp.content, 'html.parser')
+        self.assertEqual(len(soup.tbody.find_all('tr')), 2)
+        self.assertIsNotNone(soup.find(attrs={'class': 'load-older'}))
+
+    @responses.activate
+    def test_load_older(self):
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            page1 = json.loads("".join(feed_file.readlines()))
+        with open('tests/fixtures/twitter.2.json', 'r') as feed_file:
+            page2 = json.loads("".join(feed_file.readlines()))
+        responses.add(responses.GET,
+                      re.compile(r'(?!.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=page1, status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=page2, status=200)
+        self.client.login(username='admin', password='test')
+
+        resp = self.client.get(self.url)
+        soup = BeautifulSoup(resp.content, 'html.parser')
+        older_url = soup.find(attrs={'class': 'load-older'})['href']
+
+        resp = self.client.get(self.url + older_url)
+        self.assertIn('max_id={}'.format(page1[-1]['id'] - 1),
+                      responses.calls[-1].request.url)
+        soup = BeautifulSoup(resp.content, 'html.parser')
+        rows = soup.tbody.find_all('tr')
+        self.assertEqual([row['data-post_id'] for row in rows],
+                         [str(tweet['id']) for tweet in page2])
+        self.assertIsNotNone(soup.find(attrs={'class': 'load-older'}))
+
+        # The older posts are kept along with the cursor
+        calls = len(responses.calls)
+        resp = self.client.get(self.url + older_url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(responses.calls), calls)
+
+        resp = self.client.get(self.url, {'cursor': 'unknown'})
+        self.assertEqual(resp.status_code, 404)
+
+    @responses.activate
+    def test_search_load_older(self):
+        with open('tests/fixtures/twitter.json', 'r') as feed_file:
+            page1 = json.loads("".join(feed_file.readlines()))
+        responses.add(responses.GET,
+                      re.compile(r'(?!.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=page1, status=200)
+        responses.add(responses.GET,
+                      re.compile(r'(?=.*max_id=\d*)https?://api.twitter.com.*'),
+                      json=[], status=200)
+        self.client.login(username='admin', password='test')
+
+        resp = self.client.get(self.url, {'q': 'snipcart'})
+        soup = BeautifulSoup(resp.content, 'html.parser')
+        rows = soup.tbody.find_all('tr')
+        self.assertEqual([row['data-post_id'] for row in rows],
+                         [str(tweet['id']) for tweet in page1
+                          if 'snipcart' in tweet['text'].lower()])
+        self.assertNotIn('snipcart', page1[-1]['text'].lower())
+        older_url = soup.find(attrs={'class': 'load-older'})['href']
+
+        # The older posts are the ones after the last post searched
+        # through, rather than the last one that matched
+        self.client.get(self.url + older_url)
+        self.assertIn('max_id={}'.format(page1[-1]['id'] - 1),
+                      responses.calls[-1].request.url)
+
     # @feed_response('twitter')
     # def test_post_allow(self, tweets):
     #     self.client.login(username='admin', password='test')
@@ -125,26 +231,87 @@ class ModerateAllowViewTest(ModerateTestMixin, TestCase):
         # Sanity check
         self.assertEqual(ModeratedItem.objects.count(), 0)
 
-        # Test with missing data
+        # Test with a post which isn't shown on the moderation page
         resp = self.client.post(self.url)
         self.assertEqual(resp.status_code, 400)
         json_resp = json.loads(force_text(resp.content))
         self.assertEqual(
             json_resp['message'],
-            'The original social feed post was not found in the POST data')
+            'The original social feed post could not be found, '
+            'please reload the page')
 
         # Now for the correct way
+        stash_posts(self.feedconfig, self.items)
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(ModeratedItem.objects.count(), 1)
+        self.assertEqual(ModeratedItem.objects.get().content,
+                         self.post.serialize())
+
+        # Idempotent?
+        resp = self.client.post(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(ModeratedItem.objects.count(), 1)
+
+
+class ModerateBulkViewTest(ModerateTestMixin, TestCase):
+    @feed_response('twitter')
+    def setUp(self, tweets):
+        super(ModerateBulkViewTest, self).setUp()
+        self.feed = FeedFactory.create('twitter')
+        self.items = self.feed.get_items(self.feedconfig)
+        self.url = reverse('wagtailsocialfeed:bulk',
+                           kwargs={'pk': self.feedconfig.id})
+
+    def test_post_permissions(self):
+        resp = self.client.post(self.url)
+        self.assertRedirects(resp, '/cms/login/?next={}'.format(self.url))
+
+    def test_http_methods(self):
+        self.client.login(username='admin', password='test')
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 405)
+
+    def test_post(self):
+        self.client.login(username='admin', password='test')
+        self.feedconfig.moderated_items.get_or_create_for(
+            self.items[0].serialize())
+
+        resp = self.client.post(self.url, data={'action': 'publish'})
+        self.assertEqual(resp.status_code, 400)
         data = {
-            'original': self.post.serialize()
+            'action': 'allow',
+            'post_id': [item.id for item in self.items[:10]],
         }
         resp = self.client.post(self.url, data=data)
+        self.assertEqual(resp.status_code, 400)
+
+        stash_posts(self.feedconfig, self.items)
+        # The amount of queries doesn't grow with the amount of posts
+        with CaptureQueriesContext(connection) as few_queries:
+            resp = self.client.post(self.url, data=dict(
+                data, post_id=[item.id for item in self.items[:2]]))
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(ModeratedItem.objects.count(), 1)
+        self.assertEqual(ModeratedItem.objects.count(), 2)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(self.url, data=data)
+        self.assertEqual(len(queries), len(few_queries))
+        self.assertEqual(resp.status_code, 200)
+        json_resp = json.loads(force_text(resp.content))
+        self.assertTrue(json_resp['allowed'])
+        self.assertEqual(set(json_resp['post_ids']),
+                         set(item.id for item in self.items[:10]))
+        self.assertEqual(ModeratedItem.objects.count(), 10)
 
-        # Idempotent?
+        data = {
+            'action': 'remove',
+            'post_id': [item.id for item in self.items[5:15]],
+        }
         resp = self.client.post(self.url, data=data)
         self.assertEqual(resp.status_code, 200)
-        self.assertEqual(ModeratedItem.objects.count(), 1)
+        json_resp = json.loads(force_text(resp.content))
+        self.assertFalse(json_resp['allowed'])
+        self.assertEqual(ModeratedItem.objects.count(), 5)
 
 
 class ModerateRemoveViewTest(ModerateTestMixin, TestCase):
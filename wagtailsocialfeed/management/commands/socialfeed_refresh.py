@@ -0,0 +1,134 @@
+from __future__ import unicode_literals
+
+import logging
+import time
+from concurrent import futures
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.utils import six
+
+from wagtailsocialfeed.models import SocialFeedConfiguration
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+from wagtailsocialfeed.utils.feed.factory import FeedFactory
+
+logger = logging.getLogger('wagtailsocialfeed')
+
+# Check for new or changed configurations at least this often (in seconds)
+MAX_SLEEP = 60
+
+
+class Command(BaseCommand):
+    help = ("Keep the cached social feeds fresh by refreshing them "
+            "ahead of their expiry.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', dest='once', default=False,
+            help="Refresh the feeds which are due once and exit, "
+                 "e.g. when running from cron.")
+        parser.add_argument(
+            '--concurrency', type=int, dest='concurrency', default=4,
+            help="The amount of feeds to refresh at the same time.")
+        parser.add_argument(
+            '--interval', type=int, dest='interval', default=None,
+            help="Refresh each feed every INTERVAL seconds. Overrides "
+                 "the WAGTAIL_SOCIALFEED_REFRESH_INTERVAL setting.")
+
+    def handle(self, *args, **options):
+        self.interval = options['interval']
+        self.verbosity = options['verbosity']
+
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max(options['concurrency'], 1))
+        try:
+            if options['once']:
+                self.refresh_due(executor)
+                return
+
+            while True:
+                next_due = self.run_cycle(executor)
+                time.sleep(min(max(next_due - time.time(), 1), MAX_SLEEP))
+        finally:
+            executor.shutdown()
+
+    def run_cycle(self, executor):
+        """
+        Refresh the feeds which are due, surviving any error (e.g. the cache
+        or database being unavailable) so the command keeps on running.
+
+        Return the time (as a timestamp) to run the next cycle.
+        """
+        # Recycle the connection of the main thread when it's gone stale
+        close_old_connections()
+        try:
+            return self.refresh_due(executor)
+        except Exception as e:
+            logger.exception("Refreshing the feeds failed")
+            self.stderr.write("Refreshing the feeds failed: {}".format(e))
+            return time.time() + MAX_SLEEP
+
+    def get_interval(self, config):
+        if self.interval is not None:
+            return self.interval
+        intervals = get_socialfeed_setting('REFRESH_INTERVAL')
+        return intervals.get(
+            config.source, get_socialfeed_setting('CACHE_DURATION') // 2)
+
+    def refresh_due(self, executor):
+        """
+        Refresh the feeds which are due on the given executor.
+
+        Return the time (as a timestamp) the next feed will be due.
+        """
+        now = time.time()
+        next_due = now + MAX_SLEEP
+        pending = {}
+        batches = {}
+
+        for config in SocialFeedConfiguration.objects.all():
+            feed = FeedFactory.create(config.source)
+            refreshed_at = feed.get_refreshed_at(config)
+            due = (refreshed_at or 0) + self.get_interval(config)
+            if due <= now:
+                if feed.batch_refresh:
+                    # Refresh all the due feeds of this source in one go
+                    batches.setdefault(config.source, (feed, []))[1].append(config)
+                else:
+                    pending[executor.submit(self.refresh, feed, [config])] = [config]
+                due = now + self.get_interval(config)
+            next_due = min(next_due, due)
+
+        for feed, configs in batches.values():
+            pending[executor.submit(self.refresh, feed, configs)] = configs
+
+        for future in futures.as_completed(pending):
+            configs = pending[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.exception("Refreshing feeds {} failed".format(
+                    ", ".join(six.text_type(config) for config in configs)))
+                results = dict((config.id, e) for config in configs)
+
+            for config in configs:
+                items = results.get(config.id)
+                if isinstance(items, Exception):
+                    self.stderr.write("Refreshing {} failed: {}".format(
+                        six.text_type(config), items))
+                    continue
+
+                if items is None:
+                    message = "Skipped {}, it is being refreshed by another worker"
+                else:
+                    message = "Refreshed {}"
+                if self.verbosity > 1:
+                    self.stdout.write(message.format(six.text_type(config)))
+        return next_due
+
+    def refresh(self, feed, configs):
+        try:
+            return feed.refresh_many(configs)
+        finally:
+            # Don't leave connections of the worker threads open
+            connection.close()
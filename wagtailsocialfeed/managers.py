@@ -1,25 +1,108 @@
-import json
+from django.db import IntegrityError, models, transaction
 
-import dateutil.parser
-from django.db import models
+from .utils import serializer
+from .utils.dates import parse_iso_date
 
 
 class ModeratedItemManager(models.Manager):
+    def _get_fields_for(self, original_post):
+        """Return the field values of a `ModeratedItem` for the original post."""
+        original_obj = serializer.loads(original_post)
+        image_dict = original_obj.get('image_dict') or {}
+        return dict(
+            posted=parse_iso_date(original_obj['posted']),
+            external_id=original_obj['id'],
+            type=original_obj.get('type') or '',
+            text=original_obj.get('text') or '',
+            thumb_url=(image_dict.get('thumb') or {}).get('url') or '',
+            content=original_post)
+
     def get_or_create_for(self, original_post):
         """
         Get an existing `ModeratedItem` based on the original_post
         or create a new one if it cannot be found.
 
+        To be used on the related manager of a `SocialFeedConfiguration`,
+        which scopes the lookup to that configuration::
+
+            config.moderated_items.get_or_create_for(original_post)
+
+        The unique constraint on the configuration and `external_id` makes
+        this safe against concurrent requests: when another request creates
+        the item first, that item is returned.
+
         :param original_post:
             The original post as a JSON string or encoded JSON object
         """
-        original_obj = json.loads(original_post)
+        fields = self._get_fields_for(original_post)
+        return self.get_or_create(external_id=fields['external_id'],
+                                  defaults=fields)
+
+    def allow_many(self, original_posts):
+        """
+        Create a `ModeratedItem` for each of the original posts which
+        doesn't have one yet, in a single transaction.
+
+        To be used on the related manager of a `SocialFeedConfiguration`,
+        just like `get_or_create_for`.
+
+        Return the external ids of all the given posts.
+
+        :param original_posts:
+            The original posts as JSON strings or encoded JSON objects
+        """
+        config = self.instance
+        posts = {}
+        for original_post in original_posts:
+            fields = self._get_fields_for(original_post)
+            posts[fields['external_id']] = fields
+
+        try:
+            with transaction.atomic():
+                existing = set(self.filter(external_id__in=posts.keys()).order_by()
+                                   .values_list('external_id', flat=True))
+                self.bulk_create([
+                    self.model(config=config, **fields)
+                    for external_id, fields in posts.items()
+                    if external_id not in existing
+                ])
+        except IntegrityError:
+            # Some of the posts were allowed by a concurrent request in the
+            # meantime; fall back to creating the items one by one.
+            with transaction.atomic():
+                for fields in posts.values():
+                    self.get_or_create(external_id=fields['external_id'],
+                                       defaults=fields)
+        return list(posts.keys())
 
-        posted = dateutil.parser.parse(original_obj['posted'])
-        external_id = original_obj['id']
-        return self.get_or_create(
-            external_id=external_id,
-            defaults=dict(
-                posted=posted,
-                external_id=external_id,
-                content=original_post))
+    def remove_many(self, external_ids):
+        """
+        Delete the `ModeratedItem`s of the posts with the given ids.
+
+        Return the amount of items deleted.
+        """
+        deleted, _rows_count = self.filter(external_id__in=external_ids).delete()
+        return deleted
+
+
+class StoredItemManager(models.Manager):
+    def replace_with(self, items):
+        """
+        Replace the stored items of a configuration with the given ones.
+
+        To be used on the related manager of a `SocialFeedConfiguration`::
+
+            config.stored_items.replace_with(items)
+
+        :param items: the `FeedItem`s last fetched from the online source
+        """
+        config = self.instance
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([
+                self.model(config=config,
+                           posted=item.posted,
+                           external_id=item.id,
+                           content=item.serialize())
+                for item in items
+            ])
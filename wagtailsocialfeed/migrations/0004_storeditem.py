@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsocialfeed', '0003_auto_20161006_1021'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fetched', models.DateTimeField(auto_now=True)),
+                ('posted', models.DateTimeField(blank=True, null=True)),
+                ('external_id', models.CharField(max_length=255)),
+                ('content', models.TextField()),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stored_items', to='wagtailsocialfeed.SocialFeedConfiguration')),
+            ],
+            options={
+                'ordering': ['-posted'],
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='storeditem',
+            index_together=set([('config', 'posted')]),
+        ),
+    ]
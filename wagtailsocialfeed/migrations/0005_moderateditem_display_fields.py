@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsocialfeed', '0004_storeditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderateditem',
+            name='text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='moderateditem',
+            name='thumb_url',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='moderateditem',
+            name='type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
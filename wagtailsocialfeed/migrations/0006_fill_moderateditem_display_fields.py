@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations
+
+
+def fill_display_fields(apps, schema_editor):
+    ModeratedItem = apps.get_model('wagtailsocialfeed', 'ModeratedItem')
+    items = ModeratedItem.objects.select_related('config')
+    for item in items.iterator():
+        content = json.loads(item.content)
+        image_dict = content.get('image_dict') or {}
+        item.type = item.config.source
+        item.text = content.get('text') or ''
+        item.thumb_url = (image_dict.get('thumb') or {}).get('url') or ''
+        item.save(update_fields=['type', 'text', 'thumb_url'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsocialfeed', '0005_moderateditem_display_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_display_fields, migrations.RunPython.noop),
+    ]
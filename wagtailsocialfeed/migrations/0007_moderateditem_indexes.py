@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep the first of the items which were moderated more than once."""
+    ModeratedItem = apps.get_model('wagtailsocialfeed', 'ModeratedItem')
+    # Clear the default ordering, which would end up in the GROUP BY
+    duplicates = ModeratedItem.objects.order_by().values('config', 'external_id') \
+        .annotate(count=Count('id'), first_id=Min('id')) \
+        .filter(count__gt=1)
+    for duplicate in duplicates:
+        ModeratedItem.objects.filter(
+            config=duplicate['config'],
+            external_id=duplicate['external_id'],
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsocialfeed', '0006_fill_moderateditem_display_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='moderateditem',
+            name='external_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moderateditem',
+            unique_together=set([('config', 'external_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='moderateditem',
+            index_together=set([('config', 'posted')]),
+        ),
+    ]
@@ -7,7 +7,7 @@ from django.utils.translation import ugettext_lazy as _
 from wagtail.wagtailadmin.edit_handlers import FieldPanel
 from wagtail.wagtailcore.models import Page
 
-from .managers import ModeratedItemManager
+from .managers import ModeratedItemManager, StoredItemManager
 from .utils import get_feed_items, get_feed_items_mix
 from .utils.feed.factory import FeedItemFactory
 
@@ -36,8 +36,85 @@ class SocialFeedConfiguration(models.Model):
         return "{} ({})".format(self.source, name)
 
 
+class ModeratedImage(dict):
+    """
+    The `image` of a `ModeratedItem`.
+
+    It holds the thumbnail from the `thumb_url` column, and is filled with
+    the full image data (including the size of the thumbnail) from the
+    `content` of the item on first use.
+    """
+    def __init__(self, item):
+        super(ModeratedImage, self).__init__(thumb={'url': item.thumb_url})
+        self._item = item
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            self.update(self._item.get_content().image or {})
+
+    def __missing__(self, key):
+        if self._loaded:
+            raise KeyError(key)
+        self._load()
+        return self[key]
+
+    def __contains__(self, key):
+        if not dict.__contains__(self, key):
+            self._load()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._load()
+        return dict.__len__(self)
+
+    def __bool__(self):
+        # There is a thumbnail, no need to decode anything
+        return True
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        self._load()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        self._load()
+        return dict.keys(self)
+
+    def values(self):
+        self._load()
+        return dict.values(self)
+
+    def items(self):
+        self._load()
+        return dict.items(self)
+
+
 @python_2_unicode_compatible
 class ModeratedItem(models.Model):
+    """
+    A post which is allowed to be shown in a moderated feed.
+
+    The fields needed to display the post are stored in their own columns,
+    so a moderated feed can be rendered without decoding the `content`.
+    All the other data of the post is available through `original_data`,
+    or as attributes just like on a `FeedItem`, which decodes the `content`
+    on first use.
+    """
     config = models.ForeignKey(SocialFeedConfiguration,
                                related_name='moderated_items',
                                on_delete=models.CASCADE)
@@ -45,13 +122,96 @@ class ModeratedItem(models.Model):
     posted = models.DateTimeField(blank=False, null=False)
 
     external_id = models.CharField(max_length=255,
-                                   blank=False)
+                                   blank=False,
+                                   db_index=True)
+    type = models.CharField(max_length=100, blank=True)
+    text = models.TextField(blank=True)
+    thumb_url = models.TextField(blank=True)
     content = models.TextField(blank=False)
 
     objects = ModeratedItemManager()
 
     class Meta:
         ordering = ['-posted', ]
+        unique_together = [
+            ('config', 'external_id'),
+        ]
+        index_together = [
+            ('config', 'posted'),
+        ]
+
+    def __str__(self):
+        return "{}<{}> ({} posted {})".format(
+            self.__class__.__name__,
+            self.type,
+            self.external_id,
+            self.posted
+        )
+
+    def __getattr__(self, name):
+        """Look for attributes in the original data, like `FeedItem` does."""
+        if name.startswith('_'):
+            raise AttributeError(name)
+        error = AttributeError("'{}' object has no attribute '{}'".format(
+            self.__class__.__name__, name))
+        if not self.type:
+            # E.g. a new item; there is no post to look in
+            raise error
+        try:
+            # Not through `original_data`: an AttributeError raised by a
+            # property ends up in here again
+            return self.get_content().original_data[name]
+        except KeyError:
+            raise error
+
+    def get_content(self):
+        if not hasattr(self, '_feeditem'):
+            item_cls = FeedItemFactory.get_class(self.type)
+            self._feeditem = item_cls.from_moderated(self)
+        return self._feeditem
+
+    @property
+    def image(self):
+        """
+        The images of the post, in the same format as `FeedItem.image`.
+
+        The thumbnail comes from its own column; the `content` is only
+        decoded when one of the other sizes is used.
+        """
+        if not self.thumb_url:
+            return None
+        return ModeratedImage(self)
+
+    @property
+    def original_data(self):
+        return self.get_content().original_data
+
+
+@python_2_unicode_compatible
+class StoredItem(models.Model):
+    """
+    A post as it was last fetched from the online source.
+
+    Only used when `PERSISTENT_STORE` is enabled; it keeps the feeds available
+    when the cache has been flushed or the online source is down.
+    """
+    config = models.ForeignKey(SocialFeedConfiguration,
+                               related_name='stored_items',
+                               on_delete=models.CASCADE)
+    fetched = models.DateTimeField(auto_now=True)
+    posted = models.DateTimeField(blank=True, null=True)
+
+    external_id = models.CharField(max_length=255,
+                                   blank=False)
+    content = models.TextField(blank=False)
+
+    objects = StoredItemManager()
+
+    class Meta:
+        ordering = ['-posted', ]
+        index_together = [
+            ('config', 'posted'),
+        ]
 
     def __str__(self):
         return "{}<{}> ({} posted {})".format(
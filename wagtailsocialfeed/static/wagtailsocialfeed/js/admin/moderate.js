@@ -1,28 +1,64 @@
 $(document).ready(function() {
+    function setState($td, allowed) {
+        $td.addClass('new-state');
+        if (allowed) {
+            $td.addClass('allowed');
+        }
+        else {
+            $td.removeClass('allowed');
+        }
+    }
+
     $('table#feeds tbody').on('click', 'td.status .status-actions a', function(e) {
         e.preventDefault();
         var url = $( this ).attr('href');
-
-        var postId = $( this ).data('post_id');
-        var originalpost = $( 'input#post_original_' + postId ).val();
         var $td = $( this ).parents('td.status');
 
-        var postdata = {
-            'original': originalpost
-        };
-
-        $.post(url, postdata, function(data) {
-            $td.addClass('new-state');
-            if (data.allowed) {
-                $td.addClass('allowed');
-            }
-            else {
-                $td.removeClass('allowed');
-            }
+        $.post(url, function(data) {
+            setState($td, data.allowed);
         })
     });
 
     $('table#feeds tbody').on('mouseleave', 'td.status.new-state', function(e) {
         $( this ).removeClass('new-state');
     });
+
+    $('table#feeds thead').on('change', 'input.select-all', function(e) {
+        $('table#feeds tbody input.select-post').prop('checked', this.checked);
+    });
+
+    $('.bulk-actions').on('click', 'button.action-bulk', function(e) {
+        e.preventDefault();
+        var url = $( this ).parents('.bulk-actions').data('url');
+        var action = $( this ).data('action');
+
+        var postIds = $('table#feeds tbody input.select-post:checked').map(function() {
+            return $( this ).val();
+        }).get();
+        if (!postIds.length) {
+            return;
+        }
+
+        var postdata = {
+            'action': action,
+            'post_id': postIds
+        };
+
+        $.ajax({
+            url: url,
+            type: 'POST',
+            data: postdata,
+            traditional: true,
+            success: function(data) {
+                $.each(data.post_ids, function(index, postId) {
+                    var $row = $('table#feeds tbody tr').filter(function() {
+                        return $( this ).attr('data-post_id') === String(postId);
+                    });
+                    setState($row.find('td.status'), data.allowed);
+                    $row.find('input.select-post').prop('checked', false);
+                });
+                $('table#feeds thead input.select-all').prop('checked', false);
+            }
+        });
+    });
 })
@@ -8,6 +8,9 @@ urlpatterns = [
     url(r'^moderate/(?P<pk>\d+)/$',
         views.ModerateView.as_view(),
         name='moderate'),
+    url(r'^moderate/(?P<pk>\d+)/bulk/$',
+        views.ModerateBulkView.as_view(),
+        name='bulk'),
     url(r'^moderate/(?P<pk>\d+)/(?P<post_id>.+)/allow/$',
         views.ModerateAllowView.as_view(),
         name='allow'),
@@ -1,36 +1,193 @@
 from __future__ import unicode_literals
 
+import calendar
+import heapq
+import logging
+import threading
+from concurrent import futures
+
+from django.apps import apps
+from django.db import connection
+from django.utils import six
+
+from .conf import get_socialfeed_setting
 from .feed.factory import FeedFactory
 
+logger = logging.getLogger('wagtailsocialfeed')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Return the process-wide thread pool used to fetch feeds concurrently.
+
+    Return `None` when concurrent fetching is disabled (`MIX_MAX_WORKERS` is 0).
+    """
+    global _executor
+
+    max_workers = get_socialfeed_setting('MIX_MAX_WORKERS')
+    if not max_workers:
+        return None
 
-def get_feed_items(feedconfig, limit=0):
+    with _executor_lock:
+        if _executor is None or _executor[0] != max_workers:
+            if _executor is not None:
+                _executor[1].shutdown(wait=False)
+            _executor = (max_workers,
+                         futures.ThreadPoolExecutor(max_workers=max_workers))
+        return _executor[1]
+
+
+def get_feed_items(feedconfig, limit=0, wait=True):
     """Return the items of a specific feed.
 
     :param feedconfig: the `SocialFeedConfiguration` to be used
     :param limit: limit the amount of items returned
+    :param wait: wait for another worker which is fetching the feed,
+        see `AbstractFeed.get_items()`
     """
     if feedconfig.moderated:
+        # The items of the related manager already refer to `feedconfig`,
+        # so `item.config` doesn't cost a query per item. Neither does
+        # the original data of the items: it is only decoded when needed,
+        # but the content is loaded right away.
         qs = feedconfig.moderated_items.all()
         if limit:
             return qs[:limit]
         return qs
 
     stream = FeedFactory.create(feedconfig.source)
-    return stream.get_items(config=feedconfig, limit=limit)
+    return stream.get_items(config=feedconfig, limit=limit, wait=wait)
+
+
+def _newest_first_key(item):
+    """Sort key to put the newest items first; items without a date go last."""
+    if item.posted is None:
+        return float('inf')
+    return -(calendar.timegm(item.posted.utctimetuple())
+             + item.posted.microsecond / 1e6)
+
+
+def _get_feed_items_in_thread(feedconfig, limit=0):
+    try:
+        # Waiting for another worker to fetch the feed would keep this
+        # thread of the shared pool from fetching the other feeds
+        return get_feed_items(feedconfig, limit=limit, wait=False)
+    finally:
+        # Don't leave the connection of the worker thread open
+        connection.close()
+
+
+def _get_stored_items_mix(feedconfigs, limit=0):
+    """Return the stored items of the given feeds combined, newest first."""
+    StoredItem = apps.get_model('wagtailsocialfeed', 'StoredItem')
+    qs = StoredItem.objects.filter(config__in=feedconfigs).select_related('config')
+    if limit:
+        qs = qs[:limit]
+    return (stored_item.get_content() for stored_item in qs)
+
+
+def _sorted_by_date(items):
+    # The online sources return their posts newest first, so this
+    # is next to free; it just guards the merge against any exceptions
+    return sorted(items, key=_newest_first_key)
+
+
+def merge_feed_items(feeds, limit=0):
+    """Merge several lists of items into one, newest first.
+
+    This is a k-way merge: each of the `feeds` should already be ordered
+    newest first. It stops as soon as `limit` items have been returned.
+
+    :param feeds: iterables of feed items, each ordered newest first
+    :param limit: limit the result set
+    """
+    heap = []
+    for index, feed in enumerate(feeds):
+        iterator = iter(feed)
+        for item in iterator:
+            heap.append((_newest_first_key(item), index, item, iterator))
+            break
+    heapq.heapify(heap)
+
+    count = 0
+    while heap:
+        key, index, item, iterator = heap[0]
+        yield item
+
+        count += 1
+        if count == limit:
+            return
+
+        for item in iterator:
+            heapq.heapreplace(
+                heap, (_newest_first_key(item), index, item, iterator))
+            break
+        else:
+            heapq.heappop(heap)
 
 
 def get_feed_items_mix(feedconfigs, limit=0):
     """Return the items of all the feeds combined.
 
+    The feeds which are not moderated are fetched concurrently on a thread
+    pool. A feed which fails, or isn't fetched within `MIX_TIMEOUT` seconds,
+    is left out of the result instead of holding up the other feeds. The
+    pool doesn't wait for a feed which is being fetched by another worker
+    either; the persistent store is used for it instead (when enabled).
+
+    No more than `limit` items are requested from each feed, after which
+    the feeds are merged into one list ordered by date.
+
     :param feedconfigs: a list of `SocialFeedConfiguration` objects
     :param limit: limit the result set
     """
-    items = []
+    feeds = []
+    pending = {}
+    executor = _get_executor()
+
+    if get_socialfeed_setting('PERSISTENT_STORE') and \
+            get_socialfeed_setting('CACHE_READ_ONLY'):
+        # The persistent store is kept up to date by the `socialfeed_refresh`
+        # command, so let the database merge and limit those feeds
+        feeds.append(_get_stored_items_mix(
+            [config for config in feedconfigs if not config.moderated], limit))
+        feedconfigs = [config for config in feedconfigs if config.moderated]
+
     for config in feedconfigs:
-        items.extend(get_feed_items(config))
+        if config.moderated:
+            # Moderated feeds are (lazy) querysets, already ordered by date.
+            # There is no need to hand them to another thread (and connection)
+            feeds.append(get_feed_items(config, limit=limit))
+        elif executor is None:
+            feeds.append(_sorted_by_date(get_feed_items(config, limit=limit)))
+        else:
+            pending[executor.submit(_get_feed_items_in_thread, config, limit)] = config
 
-    # Make sure the date-order is correct
-    items = sorted(items, key=lambda x: x.posted, reverse=True)
-    if limit:
-        return items[:limit]
-    return items
+    try:
+        for future in futures.as_completed(
+                pending, timeout=get_socialfeed_setting('MIX_TIMEOUT')):
+            try:
+                feeds.append(_sorted_by_date(future.result()))
+            except Exception:
+                logger.exception("Fetching the items of feed {} failed".format(
+                    pending[future]))
+    except futures.TimeoutError:
+        late = [future for future in pending if not future.done()]
+        logger.warning("Fetching the items of feed(s) {} timed out, they "
+                       "are left out of the mix".format(
+                           ", ".join(six.text_type(pending[future])
+                                     for future in late)))
+        # Don't leave the fetches which didn't even start queued up in the
+        # shared pool, in front of the ones of later requests
+        cancelled = [future for future in late if future.cancel()]
+        if cancelled:
+            logger.warning(
+                "The fetches of feed(s) {} didn't even start, all the threads "
+                "were busy; consider raising WAGTAIL_SOCIALFEED_MIX_MAX_WORKERS".format(
+                    ", ".join(six.text_type(pending[future])
+                              for future in cancelled)))
+
+    return list(merge_feed_items(feeds, limit=limit))
@@ -0,0 +1,201 @@
+from __future__ import unicode_literals
+
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+from wagtailsocialfeed.utils.projection import project_original_data
+
+# Bump whenever the layout of the encoded items changes; payloads in
+# another format are treated as a cache miss.
+CACHE_FORMAT = 2
+
+
+class CacheFormatError(ValueError):
+    pass
+
+
+def encode_items(items, original_fields=None, compress_threshold=0):
+    """
+    Encode a list of `FeedItem`s into a compact payload for the cache.
+
+    Each item is reduced to a plain tuple of its fields, which pickles a lot
+    smaller and faster than the `FeedItem` objects themselves.
+
+    :param items: the `FeedItem`s to encode
+    :param original_fields: a dict mapping a source (the item `type`) to
+        the (dotted) paths of `original_data` to keep, like the
+        `KEEP_FIELDS` setting. When a source is not in there, all of the
+        original data is kept.
+    :param compress_threshold: compress the payload with zlib when it
+        exceeds this amount of bytes. Use 0 or None to never compress.
+    """
+    rows = []
+    for item in items:
+        original_data = item.original_data
+        if original_fields:
+            original_data = project_original_data(
+                original_data, item.type, keep_fields=original_fields)
+        rows.append((item.id, item.type, item.text, item.posted,
+                     item.image_dict, original_data))
+
+    body = pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)
+    size = len(body)
+    compressed = bool(compress_threshold) and size > compress_threshold
+    if compressed:
+        body = zlib.compress(body)
+    return (CACHE_FORMAT, compressed, body, size)
+
+
+def decode_rows(payload):
+    """
+    Decode a payload created by `encode_items` into rows of fields.
+
+    Raise a `CacheFormatError` when the payload is in an unknown format.
+    """
+    try:
+        cache_format = payload[0]
+    except (TypeError, IndexError, KeyError):
+        raise CacheFormatError("Unknown cache payload")
+    if cache_format != CACHE_FORMAT:
+        raise CacheFormatError(
+            "Cache payload has format {}, expected {}".format(
+                cache_format, CACHE_FORMAT))
+
+    cache_format, compressed, body, size = payload
+    if compressed:
+        body = zlib.decompress(body)
+    return pickle.loads(body)
+
+
+def iter_items_from_rows(rows, item_cls):
+    """Convert the decoded rows into `FeedItem`s, one at a time."""
+    for id, type, text, posted, image_dict, original_data in rows:
+        yield item_cls(id=id, type=type, text=text, posted=posted,
+                       image_dict=image_dict, original_data=original_data)
+
+
+class LazyItemList(object):
+    """
+    Sequence of `FeedItem`s backed by decoded rows.
+
+    The rows are only converted into `FeedItem`s when they are accessed,
+    so slicing a page out of it doesn't convert all the other items.
+    """
+    def __init__(self, rows, item_cls):
+        self.rows = rows
+        self.item_cls = item_cls
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter_items_from_rows(self.rows, self.item_cls)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(iter_items_from_rows(self.rows[index], self.item_cls))
+        return next(iter_items_from_rows([self.rows[index]], self.item_cls))
+
+
+def get_payload_size(payload):
+    """
+    Return the size in bytes of the rows of a payload created by
+    `encode_items`, before compression.
+    """
+    return payload[3]
+
+
+class LocalCache(object):
+    """
+    Small LRU cache living in the memory of the current process.
+
+    It is bounded by the amount of entries as well as by their (approximate)
+    size in bytes, and entries expire after `ttl` seconds.
+    Each entry is stored along with a version stamp; getting it with
+    a different version is treated as a miss. That way all processes drop
+    their copy once the shared cache entry has been refreshed.
+    """
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        with self._lock:
+            try:
+                entry_version, expires, size, value = self._entries[key]
+            except KeyError:
+                return None
+
+            if entry_version != version or expires <= time.time():
+                self._delete(key)
+                return None
+
+            # Mark as most recently used
+            del self._entries[key]
+            self._entries[key] = (entry_version, expires, size, value)
+            return value
+
+    def set(self, key, version, value, size):
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._delete(key)
+            self._entries[key] = (version, time.time() + self.ttl, size, value)
+            self._size += size
+
+            while (len(self._entries) > self.max_entries
+                   or self._size > self.max_bytes):
+                self._delete(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._size -= entry[2]
+
+
+_local_cache = None
+
+
+def get_local_cache():
+    """
+    Return the process-wide `LocalCache`.
+
+    Return `None` when it is disabled (`LOCAL_CACHE_MAX_ENTRIES` is 0).
+    """
+    global _local_cache
+
+    max_entries = get_socialfeed_setting('LOCAL_CACHE_MAX_ENTRIES')
+    if not max_entries:
+        return None
+
+    max_bytes = get_socialfeed_setting('LOCAL_CACHE_MAX_BYTES')
+    ttl = get_socialfeed_setting('LOCAL_CACHE_TTL')
+
+    local_cache = _local_cache
+    if local_cache is None or \
+            (local_cache.max_entries, local_cache.max_bytes, local_cache.ttl) != \
+            (max_entries, max_bytes, ttl):
+        local_cache = _local_cache = LocalCache(max_entries, max_bytes, ttl)
+    return local_cache
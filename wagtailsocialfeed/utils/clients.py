@@ -0,0 +1,48 @@
+"""
+Process-wide registry of the API clients of the sources.
+
+The clients (`Twython`, facepy's `GraphAPI`) each hold their own HTTP
+session; building them once per set of credentials keeps their
+connections alive between fetches.
+"""
+from __future__ import unicode_literals
+
+import threading
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(client_cls, *args):
+    """
+    Return the client of the given class for the given credentials,
+    creating it on first use.
+
+    :param client_cls: the class of the client, e.g. `Twython`
+    :param args: the (hashable) arguments to create the client with
+    """
+    key = (client_cls, args)
+    try:
+        return _clients[key]
+    except KeyError:
+        pass
+
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = client_cls(*args)
+        return _clients[key]
+
+
+def reset_clients():
+    """Drop all the clients; they will be recreated when needed."""
+    with _clients_lock:
+        _clients.clear()
+
+
+@receiver(setting_changed)
+def _reset_clients_on_setting_changed(setting, **kwargs):
+    if setting.startswith('WAGTAIL_SOCIALFEED_'):
+        reset_clients()
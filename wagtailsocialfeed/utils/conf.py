@@ -7,7 +7,30 @@ from django.conf import settings
 DEFAULTS = {
     'CONFIG': {},
     'CACHE_DURATION': 900,
+    'CACHE_STALE_DURATION': 0,
+    'CACHE_READ_ONLY': False,
+    'PERSISTENT_STORE': False,
+    'CACHE_LOCK_TIMEOUT': None,
+    'CACHE_LOCK_WAIT': 5,
+    'CACHE_ORIGINAL_FIELDS': {},
+    'KEEP_FIELDS': {},
+    'CACHE_COMPRESS_THRESHOLD': 0,
+    'LOCAL_CACHE_MAX_ENTRIES': 0,
+    'LOCAL_CACHE_MAX_BYTES': 10 * 1024 * 1024,
+    'LOCAL_CACHE_TTL': 60,
     'SEARCH_MAX_HISTORY': timedelta(weeks=26),
+    'MODERATE_PAGE_SIZE': 50,
+    'MODERATE_STASH_DURATION': 3600,
+    'MAX_ITEMS': None,
+    'FULL_REFRESH_INTERVAL': 3600,
+    'MIX_MAX_WORKERS': 4,
+    'MIX_TIMEOUT': 10,
+    'REFRESH_INTERVAL': {},
+    'JSON_BACKEND': 'auto',
+    'HTTP_POOL_SIZE': 10,
+    'HTTP_RETRIES': 2,
+    'HTTP_TIMEOUT': 10,
+    'ASYNC_CONCURRENCY': 10,
     'FACEBOOK_FIELDS': [
         'picture',
         'story',
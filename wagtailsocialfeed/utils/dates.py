@@ -0,0 +1,99 @@
+"""
+Fast parsers for the timestamps of the social media sources.
+
+The sources always use one fixed format, which is parsed directly here.
+Anything else falls back to the (a lot slower) dateutil parser.
+"""
+from __future__ import unicode_literals
+
+import datetime
+import functools
+import re
+
+from dateutil import parser as dateparser
+from dateutil.tz import tzoffset, tzutc
+
+MEMOIZE_MAX_ENTRIES = 4096
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+ISO_RE = re.compile(
+    r'^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?'
+    r'(Z|[+-]\d\d:?\d\d)$')
+
+UTC = tzutc()
+
+
+def memoize(func):
+    """
+    Cache the results of a function of a single (hashable) argument.
+
+    The cache is simply cleared when it exceeds `MEMOIZE_MAX_ENTRIES`.
+    """
+    results = {}
+
+    @functools.wraps(func)
+    def wrapper(value):
+        try:
+            return results[value]
+        except KeyError:
+            pass
+        if len(results) >= MEMOIZE_MAX_ENTRIES:
+            results.clear()
+        result = results[value] = func(value)
+        return result
+
+    wrapper.cache_clear = results.clear
+    return wrapper
+
+
+def _get_tz(offset):
+    """Return the tzinfo for an offset like '+0000', '-05:00' or 'Z'."""
+    if offset in ('Z', '+0000', '+00:00', '-0000', '-00:00'):
+        return UTC
+    offset = offset.replace(':', '')
+    seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return tzoffset(None, -seconds if offset[0] == '-' else seconds)
+
+
+@memoize
+def parse_twitter_date(value):
+    """
+    Parse a Twitter timestamp, e.g. 'Fri Sep 23 08:28:16 +0000 2016'.
+
+    Python's own `strptime` can't be used here: it doesn't support the `%z`
+    directive on all platforms and `%b` depends on the locale.
+    """
+    try:
+        weekday, month, day, time, offset, year = value.split(' ')
+        hour, minute, second = time.split(':')
+        return datetime.datetime(
+            int(year), MONTHS[month], int(day),
+            int(hour), int(minute), int(second), tzinfo=_get_tz(offset))
+    except (AttributeError, KeyError, ValueError):
+        return dateparser.parse(value)
+
+
+@memoize
+def parse_iso_date(value):
+    """
+    Parse an ISO 8601 timestamp with a UTC offset, as used by Facebook
+    ('2015-07-09T16:18:38+0000') and by `FeedItem.serialize()`
+    ('2016-09-23T08:28:16.123456+00:00').
+    """
+    match = ISO_RE.match(value) if value else None
+    if not match:
+        return dateparser.parse(value)
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    try:
+        return datetime.datetime(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            int(fraction.ljust(6, '0')) if fraction else 0,
+            tzinfo=_get_tz(offset))
+    except ValueError:
+        return dateparser.parse(value)
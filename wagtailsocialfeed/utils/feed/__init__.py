@@ -1,30 +1,49 @@
 from __future__ import unicode_literals
 
-import json
 import logging
 import datetime
+import itertools
+import threading
+import time
+import uuid
+import warnings
 from dateutil.tz import tzutc
 
 from django.core.cache import cache
+from django.db import connection
 from django.utils import six
 
+from wagtailsocialfeed.utils import http, serializer
+from wagtailsocialfeed.utils.cache import (CacheFormatError, LazyItemList,
+                                           decode_rows, encode_items,
+                                           get_local_cache, get_payload_size,
+                                           iter_items_from_rows)
 from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+from wagtailsocialfeed.utils.projection import project_original_data  # noqa: F401
+from wagtailsocialfeed.utils.serializer import date_handler  # noqa: F401
 
 logger = logging.getLogger('wagtailsocialfeed')
 
 
-def date_handler(obj):
-    if hasattr(obj, 'isoformat'):
-        return obj.isoformat()
-    else:  # pragma: no cover
-        raise TypeError
-
-
 class FeedError(Exception):
     pass
 
 
+class FeedNotModified(Exception):
+    """Raised by `AbstractFeedQuery._load()` when the source replies 304."""
+
+
 class FeedItem(object):
+    """
+    A single post of a social feed.
+
+    The core fields are stored in slots, which keeps the items small and
+    the attribute access fast. All the other data returned by the online
+    source is available as attributes as well, through `original_data`.
+    """
+    __slots__ = ('id', 'type', 'text', 'posted', 'image_dict',
+                 'original_data', 'allowed')
+
     def __init__(self, id, type, text, posted, image_dict, *args, **kwargs):
         self.id = six.text_type(id)  # Ensure it's a string
         self.type = type
@@ -51,28 +70,51 @@ class FeedItem(object):
         """
         return self.image_dict
 
-    def __getattribute__(self, name):
+    def __getattr__(self, name):
         """
-        Look for attributes in both the `FeedItem` as well as the original data.
+        Look for attributes in the original data.
 
-        Return an `AttributeError` when the attribute can't be found in either
-        of the two sources
+        This is only called when the attribute can't be found on the
+        `FeedItem` itself. Return an `AttributeError` when the attribute
+        can't be found in the original data either.
         """
         try:
-            return object.__getattribute__(self, name)
-        except AttributeError as e:
             original_data = object.__getattribute__(self, 'original_data')
-            if name in original_data:
-                return original_data[name]
-            raise e
+        except AttributeError:
+            # Not initialized (yet), e.g. while unpickling
+            raise AttributeError(name)
+        try:
+            return original_data[name]
+        except KeyError:
+            raise AttributeError(
+                "'{}' object has no attribute '{}'".format(
+                    self.__class__.__name__, name))
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def as_dict(self):
+        """Return the fields of this item as a dict."""
+        return {
+            'id': self.id,
+            'type': self.type,
+            'text': self.text,
+            'posted': self.posted,
+            'image_dict': self.image_dict,
+            'original_data': self.original_data,
+        }
 
     def serialize(self):
-        return json.dumps(vars(self), default=date_handler)
+        return serializer.dumps(self.as_dict())
 
     @classmethod
     def from_moderated(cls, moderated):
         """Create an `FeedItem` object from a `ModeratedItem`"""
-        source = json.loads(moderated.content)
+        source = serializer.loads(moderated.content)
 
         # We could convert source['posted'] to a proper DateTime
         # object but why bother when it is saved in
@@ -105,11 +147,28 @@ class AbstractFeedQuery(object):
         self.exhausted = False
         self.oldest_post = None
 
-    def get_paginator(self):
+        # Things needed for conditional requests: the validators (the ETag
+        # and Last-Modified of an earlier response) to send along with the
+        # request of the first page, and the validators of its response.
+        # Only sources which support them use these.
+        self.validators = None
+        self.response_validators = None
+
+    def get_paginator(self, newer_than=None, older_than=None):
+        """
+        Return a generator which loads the result pages one after another.
+
+        :param newer_than: only load posts newer than this `FeedItem`.
+            Only to be used when `supports_newer_than()` returns `True`.
+        :param older_than: start loading at the post right after this
+            `FeedItem`. Only to be used when `supports_older_than()`
+            returns `True`.
+        """
+        base_kwargs = self._get_base_kwargs(newer_than, older_than)
         while not self.exhausted:
-            kwargs, result = {}, []
+            kwargs, result = dict(base_kwargs), []
             if self.oldest_post:
-                kwargs = self._get_load_kwargs(self.oldest_post)
+                kwargs.update(self._get_load_kwargs(self.oldest_post))
             try:
                 result, self.oldest_post = self.__load(**kwargs)
             finally:
@@ -117,10 +176,45 @@ class AbstractFeedQuery(object):
                     self.exhausted = True
             yield result, self.oldest_post
 
+    def _get_base_kwargs(self, newer_than=None, older_than=None):
+        """Get the kwargs passed to `self._load()` for every result-page."""
+        base_kwargs = {}
+        if newer_than is not None:
+            base_kwargs.update(self._get_since_kwargs(newer_than))
+        if older_than is not None:
+            base_kwargs.update(self._get_until_kwargs(older_than))
+        return base_kwargs
+
     def _get_load_kwargs(self, oldest_post):
         """Get the kwargs needed to `self._load()` to get the correct results."""
         return {}
 
+    def supports_newer_than(self, newest_item):
+        """Determine if we can load just the posts newer than `newest_item`."""
+        return self._get_since_kwargs(newest_item) is not None
+
+    def _get_since_kwargs(self, newest_item):
+        """
+        Get the kwargs needed to `self._load()` to only get posts newer
+        than the given `FeedItem`.
+
+        Return `None` when the source doesn't support this.
+        """
+        return None
+
+    def supports_older_than(self, oldest_item):
+        """Determine if we can continue loading after `oldest_item`."""
+        return self._get_until_kwargs(oldest_item) is not None
+
+    def _get_until_kwargs(self, oldest_item):
+        """
+        Get the kwargs needed to `self._load()` to get the posts older
+        than the given `FeedItem`.
+
+        Return `None` when the source doesn't support this.
+        """
+        return None
+
     def __load(self, **kwargs):
         """Private method to load the raw results and the oldest post in the
         result set.
@@ -133,8 +227,13 @@ class AbstractFeedQuery(object):
         It will call the protected `_load()` method, perform
         a search when needed and store the oldest post.
         """
-        raw = self._load(**kwargs)
+        return self._filter_page(self._load(**kwargs))
 
+    def _filter_page(self, raw):
+        """
+        Return the raw results of a page, filtered on the query_string,
+        and the oldest post of the page.
+        """
         if not raw:
             return raw, None
 
@@ -159,39 +258,622 @@ class AbstractFeed(object):
     online source and converting them to `FeedItem`s.
     """
 
-    def get_items(self, config, limit=0, query_string=None, use_cache=True):
+    # Whether `refresh_many` refreshes several configurations in less
+    # round trips than refreshing them one by one
+    batch_refresh = False
+
+    def get_items(self, config, limit=0, query_string=None, use_cache=True,
+                  wait=True):
         """
         Return a list of `FeedItem`s and handle caching.
 
+        When `CACHE_STALE_DURATION` is set, the cached data is kept around
+        for that amount of seconds after it has expired. Stale data is
+        served right away while the feed is refreshed in the background;
+        only a missing entry blocks the request.
+
         :param config: `SocialFeedConfiguration` to use
         :param limit: limit the output. Use 0 or None for no limit (default=0)
         :param query_string: the search term to filter on (default=None)
         :param use_cache: utilize the cache store/retrieve the results
             (default=True)
+        :param wait: wait up to `CACHE_LOCK_WAIT` seconds for another worker
+            which is fetching the feed. Otherwise the items in the persistent
+            store, if any, are returned right away (default=True)
+        """
+        items = self.iter_items(config, query_string=query_string,
+                                use_cache=use_cache, wait=wait)
+        return list(itertools.islice(items, limit or None))
+
+    def iter_items(self, config, query_string=None, use_cache=True,
+                   wait=True):
+        """
+        Return an iterator over the `FeedItem`s, handling caching just like
+        `get_items()` does.
+
+        The data is only converted into `FeedItem`s while iterating, so
+        a caller which needs just the first couple of items doesn't pay for
+        converting all of them.
+
+        :param config: `SocialFeedConfiguration` to use
+        :param query_string: the search term to filter on (default=None)
+        :param use_cache: utilize the cache store/retrieve the results
+            (default=True)
+        :param wait: see `get_items()`
+        """
+        if use_cache:
+            return iter(self._get_cached_items(config, query_string, wait=wait))
+
+        logger.debug("Fetching data online")
+        data_raw = self._fetch_online(config=config, query_string=query_string)
+        return (self._convert_raw_item(raw) for raw in data_raw)
+
+    def get_lazy_items(self, config, query_string=None, use_cache=True):
+        """
+        Return a sequence of the `FeedItem`s, handling caching just like
+        `get_items()` does.
+
+        The cached data is only converted into `FeedItem`s for the items
+        that are accessed, which makes it cheap to paginate over.
+
+        :param config: `SocialFeedConfiguration` to use
+        :param query_string: the search term to filter on (default=None)
+        :param use_cache: utilize the cache store/retrieve the results
+            (default=True)
+        """
+        if use_cache:
+            return self._get_cached_items(config, query_string)
+        return list(self.iter_items(config, query_string=query_string,
+                                    use_cache=False))
+
+    def aget_items(self, config, limit=0, query_string=None, use_cache=True,
+                   session=None):
+        """
+        Coroutine variant of `get_items()`, fetching the feed with asyncio.
+
+        Requires Python 3.5+ and aiohttp; see
+        `wagtailsocialfeed.utils.feed.aio`.
+
+        :param session: the `aiohttp.ClientSession` to use. A session is
+            created for this call when not given.
+        """
+        from .aio import aget_items
+        return aget_items(self, config, limit=limit, query_string=query_string,
+                          use_cache=use_cache, session=session)
+
+    def arefresh(self, config, query_string=None, session=None):
+        """
+        Coroutine variant of `refresh()`, fetching the feed with asyncio.
+
+        Requires Python 3.5+ and aiohttp; see
+        `wagtailsocialfeed.utils.feed.aio`.
+        """
+        from .aio import arefresh
+        return arefresh(self, config, query_string=query_string,
+                        session=session)
+
+    def refresh(self, config, query_string=None):
+        """
+        Refresh the cached items, regardless of them being expired.
+
+        Return the refreshed list of `FeedItem`s, or `None` when another
+        worker is already refreshing them.
+
+        :param config: `SocialFeedConfiguration` to use
+        :param query_string: the search term to filter on (default=None)
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        if not self._acquire_refresh_lock(cache_key):
+            return None
+        try:
+            entry = self._get_cache_entry(cache_key)
+            previous = list(self._items_from_entry(entry)) if entry else None
+            return self._refresh(config, query_string, previous=previous)
+        finally:
+            self._release_refresh_lock(cache_key)
+
+    def refresh_many(self, configs):
+        """
+        Refresh the cached items of several configurations of this source.
+
+        Return a dict mapping the id of each configuration to the refreshed
+        list of `FeedItem`s, to `None` when another worker is already
+        refreshing them, or to the exception raised while refreshing.
+
+        :param configs: the `SocialFeedConfiguration`s to refresh
+        """
+        results = {}
+        for config in configs:
+            try:
+                results[config.id] = self.refresh(config)
+            except Exception as e:
+                logger.exception("Refreshing feed {} failed".format(config))
+                results[config.id] = e
+        return results
+
+    def get_older_items(self, config, older_than, query_string=None):
+        """
+        Fetch the result-page of posts older than the given `FeedItem`
+        from the online source. The result is not cached.
+
+        Return a tuple of the list of `FeedItem`s and the `FeedItem` to
+        pass as `older_than` to get the result-page after that. The latter
+        is `None` when there are no older posts (or the source doesn't
+        support this).
+
+        :param config: `SocialFeedConfiguration` to use
+        :param older_than: the oldest `FeedItem` seen so far
+        :param query_string: the search term to filter on (default=None)
+        """
+        query = self.query_cls(config.username, query_string)
+        if not query.supports_older_than(older_than):
+            return [], None
+
+        raw, oldest_post = next(query.get_paginator(older_than=older_than))
+        items = [self._convert_raw_item(raw_item) for raw_item in raw]
+        if oldest_post is None:
+            return items, None
+        return items, self._convert_raw_item(oldest_post)
+
+    def search_items(self, config, query_string):
+        """
+        Fetch the posts matching the search term from the online source,
+        like `get_items(use_cache=False)` does. The result is not cached.
+
+        Return a tuple of the list of `FeedItem`s and the `FeedItem` to
+        pass as `older_than` to `get_older_items()`: the oldest post that
+        was searched through, whether it matched or not.
+
+        :param config: `SocialFeedConfiguration` to use
+        :param query_string: the search term to filter on
         """
+        raw, oldest_post = self._fetch_online_pages(config, query_string)
+        items = [self._convert_raw_item(raw_item) for raw_item in raw]
+        if oldest_post is None:
+            return items, None
+        return items, self._convert_raw_item(oldest_post)
+
+    def get_refreshed_at(self, config, query_string=None):
+        """
+        Return the time the cached items were fetched, as a timestamp.
+
+        Return `None` when nothing is cached. Only the small `:refreshed`
+        key is read, not the entry with the items.
+        """
+        return cache.get(self._get_cache_key(config, query_string) + ':refreshed')
+
+    def _get_cache_key(self, config, query_string=None):
         cls_name = self.__class__.__name__
         cache_key = 'socialfeed:{}:data:{}'.format(cls_name, config.id)
         if query_string:
             cache_key += ":q-{}".format(query_string)
+        return cache_key
+
+    def _get_cache_entry(self, cache_key):
+        """
+        Get the cached entry with its rows decoded.
+
+        Look in the process' `LocalCache` first. The version stamp of the
+        entry is stored under a separate key, which is a lot cheaper to
+        fetch than the entry with all its items.
+        """
+        local_cache = get_local_cache()
+        version = None
+        if local_cache is not None:
+            version = cache.get(cache_key + ':version')
+            entry = local_cache.get(cache_key, version) if version else None
+            if entry is not None:
+                return entry
+
+        entry = self._decode_entry(cache.get(cache_key))
+        if entry and version and entry.get('version') == version:
+            local_cache.set(cache_key, version, entry, entry['size'])
+        return entry
+
+    def _decode_entry(self, entry):
+        """Decode the rows of a raw cache entry, or return `None`."""
+        if not isinstance(entry, dict):
+            return None
+        try:
+            rows = decode_rows(entry['items'])
+        except CacheFormatError as e:
+            logger.debug("Ignoring cache entry: {}".format(e))
+            return None
+        return dict(entry, rows=rows, size=get_payload_size(entry['items']))
+
+    def _items_from_entry(self, entry):
+        """Return an iterator converting the rows of an entry into `FeedItem`s."""
+        return iter_items_from_rows(entry['rows'], self.item_cls)
 
-        data = cache.get(cache_key, []) if use_cache else None
-        if data:
+    def _get_entry_or_stored(self, config, query_string):
+        """
+        Return the decoded cache entry, falling back to the items in the
+        persistent store (when enabled).
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        entry = self._get_cache_entry(cache_key)
+        if not entry and not query_string and \
+                get_socialfeed_setting('PERSISTENT_STORE'):
+            data = self._get_stored_items(config)
+            if data:
+                # Put them back in the cache, as stale data to make sure
+                # the feed is refreshed
+                logger.debug("Getting data from the persistent store")
+                self._store_items(config, query_string, data, stale=True)
+                entry = self._get_cache_entry(cache_key)
+        return entry
+
+    def _get_cached_items(self, config, query_string, wait=True):
+        """
+        Return the cached `FeedItem`s as a sequence, fetching them when
+        nothing is cached.
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        entry = self._get_entry_or_stored(config, query_string)
+        read_only = get_socialfeed_setting('CACHE_READ_ONLY')
+        if not entry:
+            # Nothing cached (or an entry in an outdated format)
+            if read_only:
+                logger.debug("No data in cache ({}), not fetching it in "
+                             "read-only mode".format(cache_key))
+                return []
+            return self._refresh_or_wait(config, query_string, wait=wait)
+
+        if entry['expires'] > time.time():
             logger.debug("Getting data from cache ({})".format(cache_key))
         else:
+            logger.debug("Serving stale data from cache ({})".format(cache_key))
+            # Only one worker needs to refresh the feed; the others keep
+            # on serving the stale data in the meantime
+            if not read_only and self._acquire_refresh_lock(cache_key):
+                self._refresh_in_background(
+                    config, query_string,
+                    previous=list(self._items_from_entry(entry)))
+        return LazyItemList(entry['rows'], self.item_cls)
+
+    def _acquire_refresh_lock(self, cache_key):
+        """
+        Claim the right to refresh the given cache entry.
+
+        `cache.add` is atomic on all the cache backends shipped with Django,
+        which makes sure only a single worker fetches a feed from the online
+        source at the same time. The lock expires after `CACHE_LOCK_TIMEOUT`
+        seconds in case the worker holding it dies.
+        """
+        return cache.add(cache_key + ':lock', True, self._get_lock_timeout())
+
+    def _get_lock_timeout(self):
+        timeout = get_socialfeed_setting('CACHE_LOCK_TIMEOUT')
+        if timeout is None:
+            # Enough for a refresh of two result-pages, even when each
+            # of their requests runs into the timeout and all the retries
+            timeout = 2 * http.get_max_request_time()
+        return timeout
+
+    def _release_refresh_lock(self, cache_key):
+        cache.delete(cache_key + ':lock')
+
+    def _refresh_or_wait(self, config, query_string=None, wait=True):
+        """
+        Refresh the feed, or wait for the worker that is refreshing it.
+
+        When the refresh lock is held by another worker we poll the version
+        stamp of the entry for `CACHE_LOCK_WAIT` seconds; the entry itself is
+        only read once it has been stored. When it isn't there by then, we
+        only fetch the feed ourselves when we manage to claim the lock (i.e.
+        the other worker is done or died). Otherwise we give up and serve the
+        items in the persistent store, if any, so a slow source doesn't get
+        a request from every waiting worker.
+
+        :param wait: when `False`, serve those items right away instead
+            of waiting
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        if self._acquire_refresh_lock(cache_key):
             logger.debug("Fetching data online")
+            try:
+                return self._refresh(config, query_string)
+            finally:
+                self._release_refresh_lock(cache_key)
+
+        if not wait:
+            logger.debug("Not waiting for another worker to refresh "
+                         "{}".format(cache_key))
+            return self._get_fallback_items(config, query_string)
+
+        version = cache.get(cache_key + ':version')
+        deadline = time.time() + get_socialfeed_setting('CACHE_LOCK_WAIT')
+        while time.time() < deadline:
+            time.sleep(0.1)
+            new_version = cache.get(cache_key + ':version')
+            if new_version is None or new_version == version:
+                continue
+            version = new_version
+            entry = self._get_cache_entry(cache_key)
+            if entry:
+                logger.debug("Getting data from cache after waiting for "
+                             "another worker ({})".format(cache_key))
+                return list(self._items_from_entry(entry))
+
+        if self._acquire_refresh_lock(cache_key):
+            logger.debug("Fetching data online after waiting for another "
+                         "worker ({})".format(cache_key))
+            try:
+                return self._refresh(config, query_string)
+            finally:
+                self._release_refresh_lock(cache_key)
 
-            data_raw = self._fetch_online(config=config, query_string=query_string)
-            data = list(map(self._convert_raw_item, data_raw))
+        logger.warning("Gave up waiting for another worker to refresh "
+                       "{}".format(cache_key))
+        return self._get_fallback_items(config, query_string)
 
-            if use_cache:
-                logger.debug("Storing data in cache ({})".format(cache_key))
-                cache.set(cache_key, data,
-                          get_socialfeed_setting('CACHE_DURATION'))
+    def _get_fallback_items(self, config, query_string=None):
+        """
+        Return the items to serve when the feed can't be fetched: the items
+        in the persistent store (when enabled), or nothing.
+        """
+        if not query_string and get_socialfeed_setting('PERSISTENT_STORE'):
+            return self._get_stored_items(config)
+        return []
 
-        if limit:
-            return data[:limit]
+    def _refresh(self, config, query_string=None, previous=None):
+        """
+        Fetch the feed from the online source and store it in the cache.
+
+        :param previous: the `FeedItem`s that are currently cached, if any.
+            When given, only the newer posts are fetched (when supported by
+            the source) and merged into them. Or, when the source supports
+            conditional requests and replies the feed wasn't modified, the
+            cached entry just gets a new expiry.
+        """
+        validators = full_refreshed = None
+        if previous:
+            validators = cache.get(self._get_cache_key(config, query_string) + ':validators')
+            full_refreshed = self._get_full_refreshed(config, query_string)
+        # Merging into the previous items only ever adds posts; refetch
+        # them all now and then to drop the deleted and edited ones
+        incremental = previous if not self._full_refresh_due(full_refreshed) else None
+        try:
+            data, validators = self._fetch_items(
+                config, query_string, previous=incremental, validators=validators)
+        except FeedNotModified:
+            if self._extend_cache_entry(config, query_string, validators):
+                return previous
+            # The entry is gone in the meantime
+            data, validators = self._fetch_items(config, query_string,
+                                                 previous=incremental)
+        self._save_items(config, query_string, data, validators=validators,
+                         full_refreshed=full_refreshed if incremental else None)
         return data
 
+    def _get_full_refreshed(self, config, query_string=None):
+        """
+        Return the time the cached items were last fetched in full (rather
+        than merged into), as a timestamp. Return `None` when unknown.
+        """
+        return cache.get(self._get_cache_key(config, query_string) + ':full')
+
+    def _full_refresh_due(self, full_refreshed):
+        """Determine if the items should be fetched in full, see `FULL_REFRESH_INTERVAL`."""
+        interval = get_socialfeed_setting('FULL_REFRESH_INTERVAL')
+        if not interval:
+            return False
+        return full_refreshed is None or full_refreshed + interval <= time.time()
+
+    def _save_items(self, config, query_string, data, validators=None,
+                    full_refreshed=None):
+        """
+        Store freshly fetched `FeedItem`s in the cache and, when enabled,
+        in the persistent store.
+
+        :param validators: the validators of the response (see
+            `AbstractFeedQuery.validators`), if any
+        :param full_refreshed: the time the items were last fetched in
+            full, when they are merged into the previous ones (default: now)
+        """
+        self._store_items(config, query_string, data, validators=validators,
+                          full_refreshed=full_refreshed)
+        if not query_string and get_socialfeed_setting('PERSISTENT_STORE'):
+            config.stored_items.replace_with(data)
+
+    def _get_stored_items(self, config):
+        """Return the `FeedItem`s kept in the persistent store."""
+        stored = config.stored_items.select_related('config')
+        return [stored_item.get_content() for stored_item in stored]
+
+    def _refresh_in_background(self, config, query_string=None, previous=None):
+        """
+        Run `_refresh()` in a separate thread and return that thread.
+
+        The refresh lock, when acquired by the caller, is released
+        once the thread is done.
+        """
+        cache_key = self._get_cache_key(config, query_string)
+
+        def refresh():
+            try:
+                self._refresh(config, query_string, previous=previous)
+            except Exception:
+                logger.exception("Refreshing {} in the background failed".format(
+                    cache_key))
+            finally:
+                self._release_refresh_lock(cache_key)
+                # Don't leave the connection of this thread open
+                connection.close()
+
+        thread = threading.Thread(target=refresh)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _store_items(self, config, query_string, data, stale=False,
+                     validators=None, full_refreshed=None):
+        """
+        Store the `FeedItem`s in the cache.
+
+        :param stale: store the items as being expired already, so they
+            will be refreshed the next time they are requested
+        :param validators: the validators of the response the items were
+            fetched with, to send along with the next request for them
+        :param full_refreshed: the time the items were last fetched in
+            full (default: now, or never for stale items)
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        duration = get_socialfeed_setting('CACHE_DURATION')
+        version = uuid.uuid4().hex
+        now = time.time()
+        original_fields = get_socialfeed_setting('CACHE_ORIGINAL_FIELDS')
+        if original_fields:
+            warnings.warn(
+                "WAGTAIL_SOCIALFEED_CACHE_ORIGINAL_FIELDS is deprecated, "
+                "use WAGTAIL_SOCIALFEED_KEEP_FIELDS instead",
+                DeprecationWarning)
+        entry = {
+            'version': version,
+            'expires': now if stale else now + duration,
+            'items': encode_items(
+                data,
+                original_fields=original_fields,
+                compress_threshold=get_socialfeed_setting('CACHE_COMPRESS_THRESHOLD')),
+        }
+        logger.debug("Storing data in cache ({})".format(cache_key))
+        if full_refreshed is None and not stale:
+            full_refreshed = now
+        cache.set_many({
+            cache_key: entry,
+            cache_key + ':version': version,
+            cache_key + ':refreshed': None if stale else now,
+            cache_key + ':validators': validators,
+            cache_key + ':full': full_refreshed,
+        }, duration + get_socialfeed_setting('CACHE_STALE_DURATION'))
+
+    def _extend_cache_entry(self, config, query_string, validators):
+        """
+        Give the cached entry a new expiry, after the source replied it
+        wasn't modified. The items are stored again as they are, without
+        decoding them.
+
+        Return `False` when there is no entry (anymore).
+        """
+        cache_key = self._get_cache_key(config, query_string)
+        entry = cache.get(cache_key)
+        if not isinstance(entry, dict):
+            return False
+
+        duration = get_socialfeed_setting('CACHE_DURATION')
+        version = uuid.uuid4().hex
+        now = time.time()
+        logger.debug("Data not modified, extending cache ({})".format(cache_key))
+        cache.set_many({
+            cache_key: dict(entry, version=version, expires=now + duration),
+            cache_key + ':version': version,
+            cache_key + ':refreshed': now,
+            cache_key + ':validators': validators,
+            # The conditional request was for the full result-page
+            cache_key + ':full': now,
+        }, duration + get_socialfeed_setting('CACHE_STALE_DURATION'))
+        return True
+
+    def _fetch_items(self, config, query_string=None, previous=None,
+                     validators=None):
+        """
+        Fetch the `FeedItem`s from the online source.
+
+        Return them along with the validators of the response, which are
+        `None` when the source doesn't support conditional requests.
+
+        :param validators: the validators to send along with the request,
+            raises `FeedNotModified` when the source replies the feed
+            wasn't modified since
+        """
+        if previous and not query_string:
+            data_raw = self._fetch_newer(config, previous)
+            if data_raw is not None:
+                logger.debug("Fetched {} new items online".format(len(data_raw)))
+                return self._merge_items(
+                    list(map(self._convert_raw_item, data_raw)), previous), None
+
+        query = self._get_query(config, query_string)
+        query.validators = validators
+        data_raw = self._fetch_online(config=config, query_string=query_string,
+                                      query=query)
+        return list(map(self._convert_raw_item, data_raw)), query.response_validators
+
+    def _merge_items(self, new_items, previous):
+        """
+        Merge newly fetched `FeedItem`s into the previously fetched ones.
+
+        The result is deduplicated on the item id and trimmed to `MAX_ITEMS`
+        items or, when that isn't set, to the length of the previous list.
+        """
+        max_items = get_socialfeed_setting('MAX_ITEMS') or \
+            max(len(previous), len(new_items))
+
+        seen, merged = set(), []
+        for item in new_items + previous:
+            if item.id in seen:
+                continue
+            seen.add(item.id)
+            merged.append(item)
+            if len(merged) >= max_items:
+                break
+        return merged
+
+    def _fetch_newer(self, config, previous):
+        """
+        Fetch the posts newer than the previously fetched ones from the
+        online source.
+
+        Return `None` when the source doesn't support fetching just the
+        newer posts.
+
+        :param config: `SocialFeedConfiguration` to use
+        :param previous: the `FeedItem`s fetched so far, newest first
+        """
+        newest_item = previous[0]
+        query = self._get_query(config)
+        if not query.supports_newer_than(newest_item):
+            return None
+
+        known_ids = set(item.id for item in previous)
+        max_items = get_socialfeed_setting('MAX_ITEMS')
+        raw, oldest_post = [], None
+        for _raw, _oldest_post in query.get_paginator(newer_than=newest_item):
+            if not _raw:
+                break
+            if oldest_post and _oldest_post['id'] == oldest_post['id']:
+                logger.warning("Trying to fetch older items but received "
+                               "same result set. Breaking the loop.")
+                break
+            oldest_post = _oldest_post
+            _raw, reached = self._take_newer(_raw, newest_item, known_ids)
+            raw += _raw
+            if reached or (max_items and len(raw) >= max_items):
+                break
+        return raw
+
+    def _take_newer(self, raw, newest_item, known_ids):
+        """
+        Return the raw posts of a result-page up to the first one that was
+        fetched before (or is older than that), and whether the page got
+        that far. Posts of the same second as `newest_item` are kept.
+
+        Not every source applies its "since" parameter to all the
+        result-pages (the 'next' links of the Graph API drop it), so this
+        is what ends the paging of an incremental refresh.
+
+        :param raw: the raw posts of the result-page, newest first
+        :param newest_item: the newest `FeedItem` fetched before
+        :param known_ids: the ids of the `FeedItem`s fetched before
+        """
+        for index, raw_item in enumerate(raw):
+            posted = self.item_cls.get_post_date(raw_item)
+            if raw_item['id'] in known_ids or (
+                    posted is not None and newest_item.posted is not None
+                    and posted < newest_item.posted):
+                return raw[:index], True
+        return raw, False
+
     def _more_history_allowed(self, oldest_date):
         """
         Determine if we should load more history.
@@ -205,7 +887,12 @@ class AbstractFeed(object):
         last_allowed = now - get_socialfeed_setting('SEARCH_MAX_HISTORY')
         return oldest_date > last_allowed
 
-    def _fetch_online(self, config, query_string=None):
+    def _get_query(self, config, query_string=None):
+        if not hasattr(self, 'query_cls'):
+            raise NotImplementedError('query_cls needs to be defined')
+        return self.query_cls(config.username, query_string)
+
+    def _fetch_online(self, config, query_string=None, query=None):
         """
         Fetch the data from the online source.
 
@@ -217,11 +904,18 @@ class AbstractFeed(object):
 
         :param config: `SocialFeedConfiguration` to use
         :param query_string: the search term to filter on (default=None)
+        :param query: the `AbstractFeedQuery` to use (default: a new one)
         """
-        if not hasattr(self, 'query_cls'):
-            raise NotImplementedError('query_cls needs to be defined')
+        return self._fetch_online_pages(config, query_string, query=query)[0]
 
-        query = self.query_cls(config.username, query_string)
+    def _fetch_online_pages(self, config, query_string=None, query=None):
+        """
+        Like `_fetch_online()`, but return a tuple of the raw posts and the
+        oldest post of the result-pages they were taken from, which doesn't
+        need to match the `query_string`.
+        """
+        if query is None:
+            query = self._get_query(config, query_string)
         paginator = query.get_paginator()
         raw, oldest_post = next(paginator)
         if query_string:
@@ -231,7 +925,7 @@ class AbstractFeed(object):
                 if not _raw:
                     break
 
-                oldest_post_date = self._convert_raw_item(oldest_post).posted
+                oldest_post_date = self.item_cls.get_post_date(oldest_post)
                 if not self._more_history_allowed(oldest_post_date):
                     break
 
@@ -241,7 +935,7 @@ class AbstractFeed(object):
                     break
                 oldest_post = _oldest_post
                 raw += _raw
-        return raw
+        return raw, oldest_post
 
     def _convert_raw_item(self, raw):
         """Convert a raw data-dict into a FeedItem subclass."""
@@ -0,0 +1,503 @@
+"""
+Asyncio variant of the feeds, built on aiohttp.
+
+It lets a single event loop fetch the feeds of many configurations at the
+same time. The amount of concurrent requests to each source is bounded by
+`ASYNC_CONCURRENCY`.
+
+This module requires Python 3.5+ and aiohttp, so it is only imported when
+needed; see `AbstractFeed.aget_items()`, `AbstractFeed.arefresh()` and
+`arefresh_many()`.
+"""
+import asyncio
+import functools
+import itertools
+import logging
+import time
+import weakref
+from urllib.parse import urlencode
+
+import aiohttp
+from django.core.cache import cache
+from django.db import connection
+from oauthlib.oauth1 import Client as OAuth1Client
+from yarl import URL
+
+from wagtailsocialfeed.utils import http
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+
+from . import AbstractFeedQuery, FeedError, FeedNotModified
+from .facebook import FacebookFeedQuery
+from .instagram import InstagramFeedQuery
+from .twitter import TwitterFeedQuery
+from .twitter import settings as twitter_settings
+
+logger = logging.getLogger('wagtailsocialfeed')
+
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_BACKOFF = 0.5
+
+_semaphores = weakref.WeakKeyDictionary()
+_background_tasks = set()
+
+
+def create_session():
+    """Create an `aiohttp.ClientSession` using the `HTTP_TIMEOUT` setting."""
+    return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(
+        total=get_socialfeed_setting('HTTP_TIMEOUT')))
+
+
+def get_semaphore(source):
+    """
+    Return the semaphore bounding the concurrent requests to `source`
+    on the current event loop.
+    """
+    loop = asyncio.get_event_loop()
+    concurrency = get_socialfeed_setting('ASYNC_CONCURRENCY')
+    semaphores = _semaphores.setdefault(loop, {})
+    key = (source, concurrency)
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(concurrency)
+    return semaphores[key]
+
+
+async def _run_in_executor(func, *args):
+    """
+    Run `func`, which talks to the cache or the database, in the default
+    executor of the event loop, so it doesn't block the loop. Django's
+    cache backends (e.g. memcached, redis) and database are synchronous.
+    """
+    def run():
+        try:
+            return func(*args)
+        finally:
+            # Don't leave the connection of the worker thread open
+            connection.close()
+
+    return await asyncio.get_event_loop().run_in_executor(None, run)
+
+
+class AsyncPaginator(object):
+    """Async iterator over the result-pages of an `AsyncAbstractFeedQuery`."""
+
+    def __init__(self, query, base_kwargs):
+        self.query = query
+        self.base_kwargs = base_kwargs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        query = self.query
+        if query.exhausted:
+            raise StopAsyncIteration
+
+        kwargs, result = dict(self.base_kwargs), []
+        if query.oldest_post:
+            kwargs.update(query._get_load_kwargs(query.oldest_post))
+        try:
+            result, query.oldest_post = await query._load_page(**kwargs)
+        finally:
+            if not result:
+                query.exhausted = True
+        return result, query.oldest_post
+
+
+class AsyncAbstractFeedQuery(AbstractFeedQuery):
+    """
+    Asyncio counterpart of `AbstractFeedQuery`.
+
+    Subclasses implement the coroutine `_aload()` instead of `_load()` and
+    are combined with the query of their source for everything else:
+
+        class AsyncTwitterFeedQuery(AsyncAbstractFeedQuery, TwitterFeedQuery):
+            async def _aload(self, max_id=None, since_id=None):
+                ...
+
+    The result pages are loaded with an async iterator:
+
+        async for raw, oldest_post in query.get_paginator():
+            ...
+
+    :param session: the `aiohttp.ClientSession` to send the requests with
+    :param semaphore: bounds the amount of concurrent requests (optional)
+    """
+    def __init__(self, username, query_string, session, semaphore=None):
+        super().__init__(username, query_string)
+        self.session = session
+        self.semaphore = semaphore
+
+    def get_paginator(self, newer_than=None, older_than=None):
+        """
+        Return an async iterator which loads the result pages one after
+        another (see `AbstractFeedQuery.get_paginator()`).
+        """
+        return AsyncPaginator(self, self._get_base_kwargs(newer_than, older_than))
+
+    async def _load_page(self, **kwargs):
+        if self.semaphore is None:
+            raw = await self._aload(**kwargs)
+        else:
+            async with self.semaphore:
+                raw = await self._aload(**kwargs)
+        return self._filter_page(raw)
+
+    async def _get_json(self, url, conditional=False, **kwargs):
+        """
+        Send a GET request and return the decoded JSON response.
+
+        Connection errors and server errors are retried `HTTP_RETRIES`
+        times, like the synchronous `wagtailsocialfeed.utils.http` does.
+
+        :param conditional: send the conditional headers of `validators`
+            along, raise `FeedNotModified` when the source replies 304 and
+            keep the validators of the response in `response_validators`
+        """
+        if conditional:
+            kwargs['headers'] = dict(kwargs.get('headers') or {},
+                                     **http.get_conditional_headers(self.validators))
+        retries = get_socialfeed_setting('HTTP_RETRIES')
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                async with self.session.get(url, **kwargs) as resp:
+                    if resp.status in RETRY_STATUSES and attempt < retries:
+                        continue
+                    if resp.status == 304 and conditional:
+                        raise FeedNotModified()
+                    if resp.status != 200:
+                        raise FeedError(resp.reason)
+                    try:
+                        data = await resp.json(content_type=None)
+                    except ValueError as e:
+                        raise FeedError(e)
+                    if conditional:
+                        self.response_validators = http.get_validators(resp)
+                    return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= retries:
+                    raise
+
+    async def _aload(self, **kwargs):
+        raise NotImplementedError("_aload() needs to be implemented by the subclass")
+
+
+def _encode_params(params):
+    """Encode request parameters the way Twython does."""
+    encoded = []
+    for key, value in sorted(params.items()):
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        encoded.append((key, value))
+    return urlencode(encoded)
+
+
+class AsyncTwitterFeedQuery(AsyncAbstractFeedQuery, TwitterFeedQuery):
+    url = 'https://api.twitter.com/1.1/statuses/user_timeline.json'
+
+    async def _aload(self, max_id=None, since_id=None):
+        url = '{}?{}'.format(self.url, _encode_params(
+            self._get_params(max_id=max_id, since_id=since_id)))
+        url, headers, _ = OAuth1Client(
+            twitter_settings['CONSUMER_KEY'],
+            client_secret=twitter_settings['CONSUMER_SECRET'],
+            resource_owner_key=twitter_settings['ACCESS_TOKEN_KEY'],
+            resource_owner_secret=twitter_settings['ACCESS_TOKEN_SECRET'],
+        ).sign(url)
+        # Send the url exactly as signed
+        return await self._get_json(URL(url, encoded=True), headers=headers)
+
+
+class AsyncInstagramFeedQuery(AsyncAbstractFeedQuery, InstagramFeedQuery):
+    async def _aload(self, max_id=None):
+        # Only the request for the first page is conditional
+        first_page = self.oldest_post is None and not max_id
+        return self._get_nodes(await self._get_json(
+            self._get_url(max_id), conditional=first_page))
+
+
+class AsyncFacebookFeedQuery(AsyncAbstractFeedQuery, FacebookFeedQuery):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The 'next' link to follow, or False when there are no more pages
+        self._next_url = None
+
+    async def _aload(self, since=None, until=None):
+        if self._next_url is False:
+            return []
+
+        url = self._next_url
+        if url is None:
+            # Like with the synchronous paginator, the kwargs only matter
+            # for the first page
+            params = {'access_token': self._graph.oauth_token}
+            if since:
+                params['since'] = since
+            if until:
+                params['until'] = until
+            url = '{}/{}&{}'.format(
+                self._graph.url, self._get_path(), urlencode(sorted(params.items())))
+
+        data = await self._get_json(url)
+        self._next_url = data.get('paging', {}).get('next') or False
+        return data.get('data', [])
+
+
+ASYNC_QUERY_CLASSES = {
+    TwitterFeedQuery: AsyncTwitterFeedQuery,
+    InstagramFeedQuery: AsyncInstagramFeedQuery,
+    FacebookFeedQuery: AsyncFacebookFeedQuery,
+}
+
+
+def get_async_query_cls(feed):
+    """Return the `AsyncAbstractFeedQuery` subclass for the given feed."""
+    try:
+        return ASYNC_QUERY_CLASSES[feed.query_cls]
+    except (AttributeError, KeyError):
+        raise NotImplementedError(
+            "No asyncio query available for {}".format(feed.__class__.__name__))
+
+
+async def _collect(paginator, more, take=None):
+    """
+    Collect the raw posts of the pages of `paginator`, for as long as
+    `more(raw, oldest_post)` returns `True` after each page.
+
+    :param take: a function returning the raw posts of a page to keep, and
+        whether to stop after that page (see `AbstractFeed._take_newer()`)
+    """
+    raw, oldest_post = [], None
+    async for _raw, _oldest_post in paginator:
+        if not _raw:
+            break
+        if oldest_post and _oldest_post['id'] == oldest_post['id']:
+            logger.warning("Trying to fetch older items but received "
+                           "same result set. Breaking the loop.")
+            break
+        oldest_post = _oldest_post
+        reached = False
+        if take is not None:
+            _raw, reached = take(_raw)
+        raw += _raw
+        if reached or not more(raw, oldest_post):
+            break
+    return raw
+
+
+async def afetch_items(feed, config, session, query_string=None, previous=None,
+                       validators=None):
+    """
+    Asyncio counterpart of `AbstractFeed._fetch_items()`, returning the
+    `FeedItem`s along with the validators of the response.
+
+    :param feed: the `AbstractFeed` to fetch the items for
+    :param session: the `aiohttp.ClientSession` to use
+    """
+    query_cls = get_async_query_cls(feed)
+    semaphore = get_semaphore(config.source)
+
+    if previous and not query_string:
+        query = query_cls(config.username, None, session, semaphore)
+        if query.supports_newer_than(previous[0]):
+            max_items = get_socialfeed_setting('MAX_ITEMS')
+            known_ids = set(item.id for item in previous)
+            raw = await _collect(
+                query.get_paginator(newer_than=previous[0]),
+                lambda raw, oldest_post: not (max_items and len(raw) >= max_items),
+                take=lambda raw: feed._take_newer(raw, previous[0], known_ids))
+            logger.debug("Fetched {} new items online".format(len(raw)))
+            return feed._merge_items(
+                list(map(feed._convert_raw_item, raw)), previous), None
+
+    query = query_cls(config.username, query_string, session, semaphore)
+    query.validators = validators
+    if query_string:
+        # Dig a bit into the history, see `AbstractFeed._fetch_online()`
+        def more(raw, oldest_post):
+            return feed._more_history_allowed(
+                feed.item_cls.get_post_date(oldest_post))
+    else:
+        def more(raw, oldest_post):
+            return False
+    raw = await _collect(query.get_paginator(), more)
+    return list(map(feed._convert_raw_item, raw)), query.response_validators
+
+
+async def _arefresh(feed, config, query_string, session, previous=None):
+    """Asyncio counterpart of `AbstractFeed._refresh()`."""
+    validators = full_refreshed = None
+    if previous:
+        validators = await _run_in_executor(
+            cache.get, feed._get_cache_key(config, query_string) + ':validators')
+        full_refreshed = await _run_in_executor(
+            feed._get_full_refreshed, config, query_string)
+    incremental = previous if not feed._full_refresh_due(full_refreshed) else None
+    try:
+        data, validators = await afetch_items(
+            feed, config, session, query_string, previous=incremental,
+            validators=validators)
+    except FeedNotModified:
+        if await _run_in_executor(feed._extend_cache_entry, config,
+                                  query_string, validators):
+            return previous
+        # The entry is gone in the meantime
+        data, validators = await afetch_items(feed, config, session, query_string,
+                                              previous=incremental)
+    await _run_in_executor(functools.partial(
+        feed._save_items, config, query_string, data, validators=validators,
+        full_refreshed=full_refreshed if incremental else None))
+    return data
+
+
+async def _arefresh_or_wait(feed, config, query_string, session):
+    """Asyncio counterpart of `AbstractFeed._refresh_or_wait()`."""
+    cache_key = feed._get_cache_key(config, query_string)
+    if await _run_in_executor(feed._acquire_refresh_lock, cache_key):
+        logger.debug("Fetching data online")
+        try:
+            return await _arefresh(feed, config, query_string, session)
+        finally:
+            await _run_in_executor(feed._release_refresh_lock, cache_key)
+
+    version = await _run_in_executor(cache.get, cache_key + ':version')
+    deadline = time.time() + get_socialfeed_setting('CACHE_LOCK_WAIT')
+    while time.time() < deadline:
+        await asyncio.sleep(0.1)
+        new_version = await _run_in_executor(cache.get, cache_key + ':version')
+        if new_version is None or new_version == version:
+            continue
+        version = new_version
+        entry = await _run_in_executor(feed._get_cache_entry, cache_key)
+        if entry:
+            logger.debug("Getting data from cache after waiting for "
+                         "another worker ({})".format(cache_key))
+            return list(feed._items_from_entry(entry))
+
+    if await _run_in_executor(feed._acquire_refresh_lock, cache_key):
+        logger.debug("Fetching data online after waiting for another "
+                     "worker ({})".format(cache_key))
+        try:
+            return await _arefresh(feed, config, query_string, session)
+        finally:
+            await _run_in_executor(feed._release_refresh_lock, cache_key)
+
+    logger.warning("Gave up waiting for another worker to refresh "
+                   "{}".format(cache_key))
+    return await _run_in_executor(feed._get_fallback_items, config, query_string)
+
+
+def _arefresh_in_background(feed, config, query_string, previous):
+    """
+    Asyncio counterpart of `AbstractFeed._refresh_in_background()`.
+
+    The refresh runs as a task on the current event loop, with a session
+    of its own, and releases the refresh lock once done.
+    """
+    cache_key = feed._get_cache_key(config, query_string)
+
+    async def refresh():
+        try:
+            async with create_session() as session:
+                await _arefresh(feed, config, query_string, session,
+                                previous=previous)
+        except Exception:
+            logger.exception("Refreshing {} in the background failed".format(
+                cache_key))
+        finally:
+            await _run_in_executor(feed._release_refresh_lock, cache_key)
+
+    task = asyncio.ensure_future(refresh())
+    # Keep a reference to the task until it's done
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _aget_cached_items(feed, config, query_string, session):
+    """Asyncio counterpart of `AbstractFeed._get_cached_items()`."""
+    cache_key = feed._get_cache_key(config, query_string)
+    entry = await _run_in_executor(feed._get_entry_or_stored, config, query_string)
+    read_only = get_socialfeed_setting('CACHE_READ_ONLY')
+    if not entry:
+        if read_only:
+            logger.debug("No data in cache ({}), not fetching it in "
+                         "read-only mode".format(cache_key))
+            return iter([])
+        return iter(await _arefresh_or_wait(feed, config, query_string, session))
+
+    if entry['expires'] > time.time():
+        logger.debug("Getting data from cache ({})".format(cache_key))
+    else:
+        logger.debug("Serving stale data from cache ({})".format(cache_key))
+        if not read_only and await _run_in_executor(
+                feed._acquire_refresh_lock, cache_key):
+            _arefresh_in_background(
+                feed, config, query_string,
+                previous=list(feed._items_from_entry(entry)))
+    return feed._items_from_entry(entry)
+
+
+async def aget_items(feed, config, limit=0, query_string=None, use_cache=True,
+                     session=None):
+    """Asyncio counterpart of `AbstractFeed.get_items()`."""
+    if session is None:
+        async with create_session() as session:
+            return await aget_items(feed, config, limit, query_string,
+                                    use_cache, session)
+
+    if use_cache:
+        items = await _aget_cached_items(feed, config, query_string, session)
+    else:
+        logger.debug("Fetching data online")
+        items, _ = await afetch_items(feed, config, session, query_string)
+    return list(itertools.islice(items, limit or None))
+
+
+async def arefresh(feed, config, query_string=None, session=None):
+    """Asyncio counterpart of `AbstractFeed.refresh()`."""
+    if session is None:
+        async with create_session() as session:
+            return await arefresh(feed, config, query_string, session)
+
+    cache_key = feed._get_cache_key(config, query_string)
+    if not await _run_in_executor(feed._acquire_refresh_lock, cache_key):
+        return None
+    try:
+        entry = await _run_in_executor(feed._get_cache_entry, cache_key)
+        previous = list(feed._items_from_entry(entry)) if entry else None
+        return await _arefresh(feed, config, query_string, session,
+                               previous=previous)
+    finally:
+        await _run_in_executor(feed._release_refresh_lock, cache_key)
+
+
+async def arefresh_many(configs, session=None):
+    """
+    Refresh the cached items of the given configurations concurrently.
+
+    The configurations may be of different sources. Return a dict like
+    `AbstractFeed.refresh_many()` does.
+
+    :param configs: the `SocialFeedConfiguration`s to refresh
+    :param session: the `aiohttp.ClientSession` to use. A session is
+        created for this call when not given.
+    """
+    from .factory import FeedFactory
+
+    if session is None:
+        async with create_session() as session:
+            return await arefresh_many(configs, session)
+
+    async def refresh(config):
+        try:
+            feed = FeedFactory.create(config.source)
+            return config.id, await arefresh(feed, config, session=session)
+        except Exception as e:
+            logger.exception("Refreshing feed {} failed".format(config))
+            return config.id, e
+
+    return dict(await asyncio.gather(*[refresh(config) for config in configs]))
@@ -1,11 +1,18 @@
+import calendar
+import logging
 from enum import Enum
 
-from dateutil import parser as dateparser
 from django.core.exceptions import ImproperlyConfigured
+from django.utils.six.moves.urllib.parse import urlparse
 from facepy import GraphAPI
+from wagtailsocialfeed.utils.clients import get_client
 from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+from wagtailsocialfeed.utils.dates import parse_iso_date
 
-from . import AbstractFeed, AbstractFeedQuery, FeedItem
+from . import (AbstractFeed, AbstractFeedQuery, FeedItem,
+               project_original_data)
+
+logger = logging.getLogger('wagtailsocialfeed')
 
 
 class PostType(Enum):
@@ -66,10 +73,12 @@ class PostType(Enum):
 class FacebookFeedItem(FeedItem):
     """Implements facebook-specific behaviour."""
 
+    __slots__ = ()
+
     @classmethod
     def get_post_date(cls, raw):
         if 'created_time' in raw:
-            return dateparser.parse(raw.get('created_time'))
+            return parse_iso_date(raw.get('created_time'))
         return None
 
     @classmethod
@@ -90,7 +99,7 @@ class FacebookFeedItem(FeedItem):
             text=item_type.get_text_from(raw),
             image_dict=image,
             posted=cls.get_post_date(raw),
-            original_data=raw,
+            original_data=project_original_data(raw, 'facebook'),
         )
 
 
@@ -105,9 +114,19 @@ class FacebookFeedQuery(AbstractFeedQuery):
                 "Make sure you define WAGTAIL_SOCIALFEED_CONFIG in your "
                 "settings with at least a 'facebook' entry.")
 
-        graph = GraphAPI("{}|{}".format(settings['CLIENT_ID'], settings['CLIENT_SECRET']))
-        required_fields = get_socialfeed_setting('FACEBOOK_FIELDS')
-        self._paginator = graph.get('{}/posts?fields={}'.format(self.username, ','.join(required_fields)), page=True)
+        self._graph = get_client(
+            GraphAPI, "{}|{}".format(settings['CLIENT_ID'], settings['CLIENT_SECRET']))
+        self._paginator = None
+
+    def _get_since_kwargs(self, newest_item):
+        if newest_item.posted is None:
+            return None
+        return {'since': calendar.timegm(newest_item.posted.utctimetuple())}
+
+    def _get_until_kwargs(self, oldest_item):
+        if oldest_item.posted is None:
+            return None
+        return {'until': calendar.timegm(oldest_item.posted.utctimetuple()) - 1}
 
     def _search(self, raw_item):
         """Very basic search function"""
@@ -118,11 +137,146 @@ class FacebookFeedQuery(AbstractFeedQuery):
         ])
         return self.query_string.lower() in all_strings.lower()
 
-    def _load(self):
-        raw = next(self._paginator)
+    def _get_path(self):
+        required_fields = get_socialfeed_setting('FACEBOOK_FIELDS')
+        return '{}/posts?fields={}'.format(self.username, ','.join(required_fields))
+
+    def get_batch_request(self, since=None):
+        """
+        Return the request for the first result-page, to be sent along
+        with others to the batch endpoint of the Graph API.
+        """
+        path = self._get_path()
+        if since:
+            path += '&since={}'.format(since)
+        return {'method': 'GET', 'relative_url': path}
+
+    def _load(self, since=None, until=None):
+        if self._paginator is None:
+            # The graph API hands us a paginator which follows the
+            # 'next' links, so the kwargs only matter for the first page
+            options = {}
+            if since:
+                options['since'] = since
+            if until:
+                options['until'] = until
+            self._paginator = self._graph.get(
+                self._get_path(), page=True, **options)
+        try:
+            raw = next(self._paginator)
+        except StopIteration:
+            return []
         return raw['data']
 
 
+def _get_relative_url(url):
+    """Turn an absolute Graph API url, e.g. a 'next' link, into a relative one."""
+    parts = urlparse(url)
+    return '{}?{}'.format(parts.path.lstrip('/'), parts.query)
+
+
 class FacebookFeed(AbstractFeed):
     item_cls = FacebookFeedItem
     query_cls = FacebookFeedQuery
+    batch_refresh = True
+
+    def refresh_many(self, configs):
+        """
+        Refresh the cached items of several Facebook configurations at once.
+
+        The first result-page of all of them is requested in a single
+        round trip, through the batch endpoint of the Graph API. So are the
+        next pages when only the posts newer than the cached ones are
+        fetched, up to the cached ones (see `AbstractFeed.refresh_many` for
+        the result).
+        """
+        results = dict((config.id, None) for config in configs)
+        locked = [config for config in configs
+                  if self._acquire_refresh_lock(self._get_cache_key(config))]
+        if not locked:
+            return results
+
+        try:
+            batch, previous, full_refreshed, graph = {}, {}, {}, None
+            for config in locked:
+                entry = self._get_cache_entry(self._get_cache_key(config))
+                query = self.query_cls(config.username, None)
+                graph = query._graph
+                since = None
+                full_refreshed[config.id] = self._get_full_refreshed(config)
+                if entry and not self._full_refresh_due(full_refreshed[config.id]):
+                    items = list(self._items_from_entry(entry))
+                    if items and query.supports_newer_than(items[0]):
+                        since = query._get_since_kwargs(items[0])['since']
+                        previous[config.id] = items
+                batch[config.id] = query.get_batch_request(since)
+
+            pages = self._load_batch(graph, batch, previous=previous)
+            for config in locked:
+                raw = pages[config.id]
+                if isinstance(raw, Exception):
+                    results[config.id] = raw
+                    continue
+
+                try:
+                    data = list(map(self._convert_raw_item, raw))
+                    if config.id in previous:
+                        data = self._merge_items(data, previous[config.id])
+                        self._save_items(config, None, data,
+                                         full_refreshed=full_refreshed[config.id])
+                    else:
+                        self._save_items(config, None, data)
+                except Exception as e:
+                    logger.exception("Refreshing feed {} failed".format(config))
+                    results[config.id] = e
+                else:
+                    results[config.id] = data
+        finally:
+            for config in locked:
+                self._release_refresh_lock(self._get_cache_key(config))
+        return results
+
+    def _load_batch(self, graph, batch, previous=None):
+        """
+        Load the raw posts of several requests using batch requests.
+
+        :param graph: the `GraphAPI` to use
+        :param batch: a dict mapping keys to the requests of the first pages
+        :param previous: a dict mapping the keys of the requests for just
+            the newer posts to the `FeedItem`s fetched before. The next pages
+            of those requests are loaded as well, until the posts fetched
+            before are reached (or `MAX_ITEMS` posts are loaded).
+        :return: a dict mapping the keys to the lists of raw posts, or to
+            the exception raised by the Graph API for that request
+        """
+        previous = previous or {}
+        known_ids = dict((key, set(item.id for item in items))
+                         for key, items in previous.items())
+        max_items = get_socialfeed_setting('MAX_ITEMS')
+        raw = dict((key, []) for key in batch)
+
+        while batch:
+            keys = list(batch)
+            responses = graph.batch([batch[key] for key in keys])
+            batch = {}
+            for key, response in zip(keys, responses):
+                if isinstance(response, Exception):
+                    logger.error("Batch request {} failed: {}".format(
+                        response.request, response))
+                    raw[key] = response
+                    continue
+
+                response = response or {}
+                data, reached = response.get('data', []), False
+                if key in previous:
+                    # The 'next' links don't keep the `since` parameter
+                    data, reached = self._take_newer(
+                        data, previous[key][0], known_ids[key])
+                raw[key] += data
+
+                next_url = response.get('paging', {}).get('next')
+                if key in previous and data and next_url and not reached and \
+                        not (max_items and len(raw[key]) >= max_items):
+                    batch[key] = {'method': 'GET',
+                                  'relative_url': _get_relative_url(next_url)}
+        return raw
@@ -1,10 +1,11 @@
 import datetime
 import logging
 
-import requests
 from django.utils import timezone
+from wagtailsocialfeed.utils import http
 
-from . import AbstractFeed, AbstractFeedQuery, FeedError, FeedItem
+from . import (AbstractFeed, AbstractFeedQuery, FeedError, FeedItem,
+               FeedNotModified, project_original_data)
 
 logger = logging.getLogger('wagtailsocialfeed')
 
@@ -12,6 +13,8 @@ logger = logging.getLogger('wagtailsocialfeed')
 class InstagramFeedItem(FeedItem):
     """Implements instagram-specific behaviour"""
 
+    __slots__ = ()
+
     @classmethod
     def get_post_date(cls, raw):
         if 'date' in raw:
@@ -47,7 +50,7 @@ class InstagramFeedItem(FeedItem):
             text=caption,
             image_dict=image,
             posted=cls.get_post_date(raw),
-            original_data=raw,
+            original_data=project_original_data(raw, 'instagram'),
         )
 
 
@@ -57,22 +60,41 @@ class InstagramFeedQuery(AbstractFeedQuery):
         # the next result-set
         return {'max_id': self.oldest_post['id']}
 
+    def _get_until_kwargs(self, oldest_item):
+        return {'max_id': oldest_item.id}
+
     def _search(self, raw_item):
         """Very basic search function"""
         return self.query_string.lower() in raw_item
 
-    def _load(self, max_id=None):
+    def _get_url(self, max_id=None):
         url = "https://www.instagram.com/{}/?__a=1".format(self.username)
         if max_id:
             url += "?max_id={}".format(max_id)
-        resp = requests.get(url)
+        return url
+
+    def _get_nodes(self, data):
+        """Return the posts in the decoded response."""
+        try:
+            return data['user']['media']['nodes']
+        except KeyError:
+            raise FeedError("No items could be found in the response")
+
+    def _load(self, max_id=None):
+        # Only the request for the first page is conditional
+        first_page = self.oldest_post is None and not max_id
+        headers = http.get_conditional_headers(self.validators) if first_page else {}
+        resp = http.get(self._get_url(max_id), headers=headers)
+        if resp.status_code == 304 and headers:
+            raise FeedNotModified()
         if resp.status_code == 200:
             try:
-                return resp.json()['user']['media']['nodes']
+                data = resp.json()
             except ValueError as e:
                 raise FeedError(e)
-            except KeyError as e:
-                raise FeedError("No items could be found in the response")
+            if first_page:
+                self.response_validators = http.get_validators(resp)
+            return self._get_nodes(data)
         raise FeedError(resp.reason)
 
 
@@ -1,11 +1,13 @@
 import logging
 
-from dateutil import parser as dateparser
 from django.core.exceptions import ImproperlyConfigured
 from twython import Twython
+from wagtailsocialfeed.utils.clients import get_client
 from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+from wagtailsocialfeed.utils.dates import parse_twitter_date
 
-from . import AbstractFeed, AbstractFeedQuery, FeedItem
+from . import (AbstractFeed, AbstractFeedQuery, FeedItem,
+               project_original_data)
 
 logger = logging.getLogger('wagtailsocialfeed')
 
@@ -18,12 +20,12 @@ if not settings:
 
 
 class TwitterFeedItem(FeedItem):
+    __slots__ = ()
+
     @classmethod
     def get_post_date(cls, raw):
-        # Use the dateutil parser because on some platforms
-        # python's own strptime doesn't support the %z directive.
         # Format: '%a %b %d %H:%M:%S %z %Y'
-        return dateparser.parse(raw.get('created_at'))
+        return parse_twitter_date(raw.get('created_at'))
 
     @classmethod
     def from_raw(cls, raw):
@@ -38,7 +40,7 @@ class TwitterFeedItem(FeedItem):
             text=raw['text'],
             image_dict=image,
             posted=date,
-            original_data=raw
+            original_data=project_original_data(raw, 'twitter'),
         )
 
 
@@ -62,29 +64,42 @@ class TwitterFeedQuery(AbstractFeedQuery):
     def __init__(self, username, query_string):
         super(TwitterFeedQuery, self).__init__(username, query_string)
 
-        self.twitter = Twython(settings['CONSUMER_KEY'],
-                               settings['CONSUMER_SECRET'],
-                               settings['ACCESS_TOKEN_KEY'],
-                               settings['ACCESS_TOKEN_SECRET'])
+        self.twitter = get_client(Twython,
+                                  settings['CONSUMER_KEY'],
+                                  settings['CONSUMER_SECRET'],
+                                  settings['ACCESS_TOKEN_KEY'],
+                                  settings['ACCESS_TOKEN_SECRET'])
 
     def _get_load_kwargs(self, oldest_post):
         # Trick from twitter API doc to exclude the oldest post from
         # the next result-set
         return {'max_id': self.oldest_post['id'] - 1}
 
+    def _get_since_kwargs(self, newest_item):
+        return {'since_id': int(newest_item.id)}
+
+    def _get_until_kwargs(self, oldest_item):
+        return {'max_id': int(oldest_item.id) - 1}
+
     def _search(self, raw_item):
         """Very basic search function"""
         return self.query_string.lower() in raw_item['text'].lower()
 
-    def _load(self, max_id=None):
-        """Return the raw data fetched from twitter."""
+    def _get_params(self, max_id=None, since_id=None):
+        """Return the parameters of the user_timeline request."""
         options = settings.get('OPTIONS', {})
-        return self.twitter.get_user_timeline(
+        return dict(
             screen_name=self.username,
             trim_user=options.get('trim_user', True),
             contributor_details=options.get('contributor_details', False),
             include_rts=options.get('include_rts', False),
-            max_id=max_id)
+            max_id=max_id,
+            since_id=since_id)
+
+    def _load(self, max_id=None, since_id=None):
+        """Return the raw data fetched from twitter."""
+        return self.twitter.get_user_timeline(
+            **self._get_params(max_id=max_id, since_id=since_id))
 
 
 class TwitterFeed(AbstractFeed):
@@ -0,0 +1,103 @@
+"""
+Shared HTTP session for the sources which talk to their API directly.
+
+Reusing one `requests.Session` keeps the connections to the source alive,
+so only the first request pays for the TCP and TLS handshakes.
+
+It also helps with conditional requests: a source which returned an `ETag`
+or `Last-Modified` header can be asked for the data only when it changed.
+"""
+from __future__ import unicode_literals
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+
+BACKOFF_FACTOR = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session_settings():
+    return (get_socialfeed_setting('HTTP_POOL_SIZE'),
+            get_socialfeed_setting('HTTP_RETRIES'))
+
+
+def _create_session(pool_size, retries):
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        # Hand the last server error back, rather than raising a
+        # `RetryError`, so callers handle it like any other error response
+        max_retries=Retry(total=retries, backoff_factor=BACKOFF_FACTOR,
+                          status_forcelist=(500, 502, 503, 504),
+                          raise_on_status=False))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide `requests.Session`.
+
+    Its connection pool is thread-safe, so it is shared by all threads.
+    A new session is created when the `HTTP_*` settings change.
+    """
+    global _session
+
+    session_settings = _get_session_settings()
+    with _session_lock:
+        if _session is None or _session[0] != session_settings:
+            if _session is not None:
+                _session[1].close()
+            _session = (session_settings, _create_session(*session_settings))
+        return _session[1]
+
+
+def get(url, **kwargs):
+    """
+    Send a GET request with the shared session.
+
+    Uses `HTTP_TIMEOUT` as the timeout, unless one is given.
+    """
+    kwargs.setdefault('timeout', get_socialfeed_setting('HTTP_TIMEOUT'))
+    return get_session().get(url, **kwargs)
+
+
+def get_max_request_time():
+    """
+    Return the longest a request can take in seconds: each of its attempts
+    running into `HTTP_TIMEOUT`, plus the backoff between the retries.
+    """
+    retries = get_socialfeed_setting('HTTP_RETRIES')
+    backoff = sum(BACKOFF_FACTOR * 2 ** attempt for attempt in range(retries))
+    return (retries + 1) * get_socialfeed_setting('HTTP_TIMEOUT') + backoff
+
+
+def get_validators(response):
+    """
+    Return the validators (`ETag` and `Last-Modified`) of a response,
+    or `None` when it has neither.
+    """
+    validators = dict(
+        (header, response.headers[header])
+        for header in ('ETag', 'Last-Modified') if response.headers.get(header))
+    return validators or None
+
+
+def get_conditional_headers(validators):
+    """Return the headers of a conditional request using the given validators."""
+    headers = {}
+    if validators:
+        if 'ETag' in validators:
+            headers['If-None-Match'] = validators['ETag']
+        if 'Last-Modified' in validators:
+            headers['If-Modified-Since'] = validators['Last-Modified']
+    return headers
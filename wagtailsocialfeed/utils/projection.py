@@ -0,0 +1,65 @@
+"""
+Selection of the fields of the original data of the posts to keep.
+"""
+from __future__ import unicode_literals
+
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+
+_field_trees = {}
+
+
+def _get_field_tree(fields):
+    """
+    Turn a list of (dotted) paths into a tree of nested dicts, e.g.
+    ['id', 'user.name', 'user.id'] into {'id': None, 'user': {'name': None, 'id': None}}.
+
+    A `None` leaf means the value is kept as a whole.
+    """
+    fields = tuple(fields)
+    try:
+        return _field_trees[fields]
+    except KeyError:
+        pass
+
+    tree = {}
+    for field in fields:
+        node = tree
+        keys = field.split('.')
+        for key in keys[:-1]:
+            child = node.get(key, {})
+            if child is None:
+                # The parent is kept as a whole already
+                break
+            node = node.setdefault(key, child)
+        else:
+            node[keys[-1]] = None
+    _field_trees[fields] = tree
+    return tree
+
+
+def _project(data, tree):
+    if isinstance(data, list):
+        return [_project(value, tree) for value in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: data[key] if subtree is None else _project(data[key], subtree)
+            for key, subtree in tree.items() if key in data}
+
+
+def project_original_data(raw, source, keep_fields=None):
+    """
+    Return the part of the `raw` data of a post to keep as `original_data`,
+    as configured per source in `WAGTAIL_SOCIALFEED_KEEP_FIELDS`.
+
+    Dotted paths select keys of nested objects; when a path runs into a list
+    the remainder of the path is applied to each of its items.
+
+    :param keep_fields: a dict mapping sources to the paths to keep, to use
+        instead of the setting
+    """
+    if keep_fields is None:
+        keep_fields = get_socialfeed_setting('KEEP_FIELDS')
+    fields = keep_fields.get(source)
+    if fields is None:
+        return raw
+    return _project(raw, _get_field_tree(fields))
@@ -0,0 +1,114 @@
+"""
+JSON serialization of the feed items.
+
+Uses orjson or ujson when installed, which are a lot faster than the json
+module of the standard library. Select the library to use with the
+`WAGTAIL_SOCIALFEED_JSON_BACKEND` setting.
+
+All the backends encode dates and times to the same ISO 8601 strings.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import importlib
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+
+from wagtailsocialfeed.utils.conf import get_socialfeed_setting
+
+AUTO_BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def date_handler(obj):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    else:  # pragma: no cover
+        raise TypeError
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=date_handler)
+
+
+def _create_orjson_backend(orjson):
+    def dumps(obj):
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            # orjson is strict about e.g. the size of integers and the type
+            # of dict keys, the standard library isn't
+            return _json_dumps(obj)
+
+    return dumps, orjson.loads
+
+
+def _create_ujson_backend(ujson):
+    def dumps(obj):
+        return ujson.dumps(obj, default=date_handler,
+                           escape_forward_slashes=False)
+
+    return dumps, ujson.loads
+
+
+def _create_json_backend(json):
+    return _json_dumps, json.loads
+
+
+BACKEND_FACTORIES = {
+    'orjson': _create_orjson_backend,
+    'ujson': _create_ujson_backend,
+    'json': _create_json_backend,
+}
+
+_backends = {}
+
+
+def _load_backend(name):
+    if name not in BACKEND_FACTORIES:
+        raise ImproperlyConfigured(
+            "Unknown WAGTAIL_SOCIALFEED_JSON_BACKEND '{}', choose from "
+            "'auto', {}".format(name, ", ".join(
+                "'{}'".format(backend) for backend in AUTO_BACKENDS)))
+    return BACKEND_FACTORIES[name](importlib.import_module(name))
+
+
+def get_backend(name=None):
+    """
+    Return the `(dumps, loads)` functions of a JSON backend.
+
+    :param name: the name of the backend. Defaults to the one configured in
+        `WAGTAIL_SOCIALFEED_JSON_BACKEND`.
+    """
+    name = name or get_socialfeed_setting('JSON_BACKEND')
+    try:
+        return _backends[name]
+    except KeyError:
+        pass
+
+    if name == 'auto':
+        for backend_name in AUTO_BACKENDS:
+            try:
+                backend = _load_backend(backend_name)
+            except ImportError:
+                continue
+            break
+    else:
+        try:
+            backend = _load_backend(name)
+        except ImportError:
+            raise ImproperlyConfigured(
+                "WAGTAIL_SOCIALFEED_JSON_BACKEND is '{0}', but {0} is not "
+                "installed".format(name))
+
+    _backends[name] = backend
+    return backend
+
+
+def dumps(obj):
+    """Serialize `obj` to a JSON formatted string."""
+    return get_backend()[0](obj)
+
+
+def loads(value):
+    """Deserialize a JSON formatted string."""
+    return get_backend()[1](value)
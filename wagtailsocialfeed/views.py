@@ -1,17 +1,46 @@
 from __future__ import unicode_literals
 
-from django.http import JsonResponse
+import uuid
+
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
 from django.utils import six
 from django.utils.translation import ugettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic.base import View
 from django.views.generic.detail import DetailView
+from wagtail.utils.pagination import paginate
 from wagtail.wagtailadmin.forms import SearchForm
 
 from .models import ModeratedItem, SocialFeedConfiguration
+from .utils.conf import get_socialfeed_setting
 from .utils.feed.factory import FeedFactory
 
 
+def _get_stash_key(config, post_id):
+    return 'socialfeed:moderate:{}:post:{}'.format(config.pk, post_id)
+
+
+def stash_posts(config, items):
+    """
+    Keep the posts shown on the moderation page on the server, so they can
+    be allowed by their id only.
+    """
+    cache.set_many(
+        {_get_stash_key(config, item.id): item.serialize() for item in items},
+        get_socialfeed_setting('MODERATE_STASH_DURATION'))
+
+
+def get_stashed_posts(config, post_ids):
+    """
+    Return a dict mapping the given post ids to the serialized posts.
+
+    Posts which are not (or no longer) stashed are left out.
+    """
+    keys = {_get_stash_key(config, post_id): post_id for post_id in post_ids}
+    return {keys[key]: post for key, post in cache.get_many(keys).items()}
+
+
 class ModerateView(DetailView):
     """
     ModerateView.
@@ -38,33 +67,88 @@ class ModerateView(DetailView):
 
         form = self.get_search_form()
         query_string = None
-        use_cache = True
 
         if form.is_valid():
-            use_cache = False
             query_string = form.cleaned_data['q']
 
-        items = feed.get_items(config=self.object, query_string=query_string,
-                               use_cache=use_cache)
+        if 'cursor' in self.request.GET:
+            items, oldest_item = self.get_older_items(
+                feed, self.request.GET['cursor'])
+        elif query_string:
+            # Older posts are loaded from the oldest post searched through,
+            # not from the oldest one that matched
+            items, oldest_item = feed.search_items(self.object, query_string)
+        else:
+            # Only the items of the requested page are converted
+            items = feed.get_lazy_items(config=self.object)
+            oldest_item = items[-1] if items else None
+
+        paginator, page = paginate(
+            self.request, items,
+            per_page=get_socialfeed_setting('MODERATE_PAGE_SIZE'))
 
         if self.object.moderated:
-            allowed_ids = self.object.moderated_items.values_list(
-                'external_id', flat=True)
-            for item in items:
-                # Flag to see if this item is already allowed in
-                # the feed or not
+            # Flag to see if the items on this page are already allowed in
+            # the feed or not
+            allowed_ids = set(self.object.moderated_items.filter(
+                external_id__in=[item.id for item in page]
+            ).order_by().values_list('external_id', flat=True))
+            for item in page:
                 item.allowed = item.id in allowed_ids
 
-        context['feed'] = items
+        stash_posts(self.object, page)
+
+        if not page.has_next() and oldest_item is not None:
+            context['older_cursor'] = self.create_cursor(oldest_item,
+                                                         query_string)
+
+        context['feed'] = page
         context['search_form'] = form
 
         return context
 
+    def get_cursor_key(self, cursor):
+        return 'socialfeed:moderate:{}:cursor:{}'.format(self.object.pk, cursor)
+
+    def create_cursor(self, oldest_item, query_string):
+        """
+        Store where to continue loading older posts on the server.
+
+        Return the token to pass as the `cursor` parameter.
+        """
+        cursor = uuid.uuid4().hex
+        cache.set(self.get_cursor_key(cursor),
+                  {'older_than': oldest_item, 'query_string': query_string},
+                  get_socialfeed_setting('CACHE_DURATION'))
+        return cursor
+
+    def get_older_items(self, feed, cursor):
+        """
+        Return the posts after the given cursor, along with the oldest one
+        of those to continue from.
+
+        The posts are only fetched once per cursor; paging through them
+        doesn't reload them from the online source.
+        """
+        key = self.get_cursor_key(cursor)
+        entry = cache.get(key)
+        if entry is None:
+            raise Http404("Unknown or expired cursor")
+
+        if 'items' not in entry:
+            entry['items'], entry['oldest_item'] = feed.get_older_items(
+                self.object, entry['older_than'],
+                query_string=entry['query_string'])
+            cache.set(key, entry, get_socialfeed_setting('CACHE_DURATION'))
+        return entry['items'], entry['oldest_item']
+
 
 error_messages = {
     'no_original':
-        _('The original social feed post was not found in the POST data'),
-    'not_found': _('The moderated item with the given id could not be found')
+        _('The original social feed post could not be found, '
+          'please reload the page'),
+    'not_found': _('The moderated item with the given id could not be found'),
+    'unknown_action': _('The action should be either "allow" or "remove"'),
 }
 
 
@@ -76,11 +160,11 @@ class ModerateAllowView(View):
     def post(self, request, pk, post_id):
         config = SocialFeedConfiguration.objects.get(pk=pk)
 
-        if 'original' not in request.POST:
+        original = get_stashed_posts(config, [post_id]).get(post_id)
+        if original is None:
             err = {'message': six.text_type(error_messages['no_original'])}
             return JsonResponse(err, status=400)
 
-        original = request.POST['original']
         item, created = config.moderated_items.get_or_create_for(original)
 
         return JsonResponse({
@@ -111,3 +195,45 @@ class ModerateRemoveView(View):
             'post_id': post_id,
             'allowed': False
         })
+
+
+class ModerateBulkView(View):
+    """
+    Allow or remove several posts at once.
+
+    Expects an `action` of either 'allow' or 'remove', along with the
+    `post_id`s of the posts.
+    """
+    @csrf_exempt
+    def dispatch(self, *args, **kwargs):
+        return super(ModerateBulkView, self).dispatch(*args, **kwargs)
+
+    def post(self, request, pk):
+        config = SocialFeedConfiguration.objects.get(pk=pk)
+        action = request.POST.get('action')
+        post_ids = request.POST.getlist('post_id')
+
+        if action == 'allow':
+            originals = get_stashed_posts(config, post_ids)
+            if not originals:
+                err = {'message': six.text_type(error_messages['no_original'])}
+                return JsonResponse(err, status=400)
+
+            # Posts which are no longer stashed are left out
+            post_ids = config.moderated_items.allow_many(originals.values())
+            return JsonResponse({
+                'message': 'The posts are now allowed on the feed',
+                'post_ids': post_ids,
+                'allowed': True
+            })
+
+        if action == 'remove':
+            config.moderated_items.remove_many(post_ids)
+            return JsonResponse({
+                'message': 'The posts are removed from the feed',
+                'post_ids': post_ids,
+                'allowed': False
+            })
+
+        err = {'message': six.text_type(error_messages['unknown_action'])}
+        return JsonResponse(err, status=400)